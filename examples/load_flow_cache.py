@@ -0,0 +1,57 @@
+import os
+import tempfile
+import time
+import traceback
+
+from simflow.control import Flow, Trigger
+from simflow.sink import Null
+from simflow.source import ForLoop
+from simflow.transformer import MathExpression, SetStorageValue
+
+
+def main():
+    """
+    Just runs some example code.
+    """
+
+    # generate a large flow
+    flow = Flow(name="large flow")
+    flow.actors.append(ForLoop())
+    for i in range(3000):
+        trigger = Trigger()
+        trigger.name = "trigger-" + str(i)
+        flow.actors.append(trigger)
+        expr = MathExpression()
+        expr.config["expression"] = "{X}*" + str(i)
+        trigger.actors.append(ForLoop())
+        trigger.actors.append(expr)
+        ssv = SetStorageValue()
+        ssv.config["storage_name"] = "value" + str(i)
+        trigger.actors.append(ssv)
+    flow.actors.append(Null())
+
+    # save it
+    fname = os.path.join(tempfile.mkdtemp(), "large.json")
+    Flow.save(flow, fname)
+
+    # compare loading times
+    start = time.time()
+    Flow.load(fname)
+    print("without cache: %.3fs" % (time.time() - start))
+    start = time.time()
+    Flow.load(fname, use_cache=True)
+    print("cold cache:    %.3fs" % (time.time() - start))
+    start = time.time()
+    loaded = Flow.load(fname, use_cache=True)
+    print("warm cache:    %.3fs" % (time.time() - start))
+    print("actors:", len(loaded.actors))
+
+    os.remove(fname)
+    os.remove(fname + ".cache")
+
+
+if __name__ == "__main__":
+    try:
+        main()
+    except Exception as e:
+        print(traceback.format_exc())
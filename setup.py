@@ -35,6 +35,11 @@ setup(
     install_requires=[
         "configurable-objects",
     ],
+    entry_points={
+        "console_scripts": [
+            "simflow=simflow.cli:sys_main",
+        ],
+    },
     version="0.0.1",
     author='Peter "fracpete" Reutemann',
     author_email='simple-flow@fracpete.org',
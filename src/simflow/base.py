@@ -1,9 +1,22 @@
+import copy
 import logging
 import re
+import sys
 import traceback
 import uuid
+import simflow.registry as registry
 
-from confobj import Configurable, has_dict_handler, register_dict_handler, get_dict_handler, get_class
+from collections import deque
+from confobj import Configurable, register_dict_handler
+
+_class_defaults = {}
+""" the default options per actor class (class -> (options, help, mutable option names)) """
+
+_IMMUTABLE_TYPES = (type(None), bool, int, float, complex, str, bytes)
+""" the types of default values that can be shared between instances """
+
+REFILL_CHUNK_SIZE = 1000
+""" the maximum number of spilled tokens an output buffer reads back at once if there is no spill threshold """
 
 
 class Stoppable(object):
@@ -41,15 +54,66 @@ class Actor(Configurable, Stoppable):
         :param config: the dictionary with the options (str -> object).
         :type config: dict
         """
-        super(Actor, self).__init__(config=config)
+        # the defaults are only determined once per class, instead of going through Configurable.__init__
+        self._logger = None
+        if config is None:
+            defaults, mutable = self._defaults()
+            self._config = dict(defaults)
+            for k in mutable:
+                self._config[k] = copy.deepcopy(defaults[k])
+        else:
+            self.config = config
         self._name = self.__class__.__name__
         self._parent = None
         self._full_name = None
         self._stopped = False
         if name is not None:
             self.name = name
-        if not has_dict_handler("Actor"):
-            register_dict_handler("Actor", Actor.from_dict)
+
+    def _defaults(self):
+        """
+        Returns the default options of the actor's class, which get computed with fix_config only once
+        per class. Also sets the help, which is shared between the instances of the class.
+
+        :return: the default options (must not be modified) and the names of the options with mutable values
+        :rtype: tuple
+        """
+        entry = _class_defaults.get(self.__class__)
+        if entry is None:
+            self._help = {}
+            defaults = self.fix_config({})
+            mutable = [k for k in defaults if not isinstance(defaults[k], _IMMUTABLE_TYPES)]
+            entry = (defaults, self._help, mutable)
+            _class_defaults[self.__class__] = entry
+        self._help = entry[1]
+        return entry[0], entry[2]
+
+    @property
+    def config(self):
+        """
+        Obtains the currently set options of the actor.
+
+        :return: the options
+        :rtype: dict
+        """
+        return self._config
+
+    @config.setter
+    def config(self, options):
+        """
+        Sets the options of the actor, missing options get filled in with their defaults.
+
+        :param options: the options
+        :type options: dict
+        """
+        defaults, mutable = self._defaults()
+        for k in defaults:
+            if k not in options:
+                if k in mutable:
+                    options[k] = copy.deepcopy(defaults[k])
+                else:
+                    options[k] = defaults[k]
+        self._config = options
 
     def __str__(self):
         """
@@ -232,10 +296,10 @@ class Actor(Configurable, Stoppable):
                     typestr = v[u"type"]
                 else:
                     typestr = v["type"]
-                conf[str(k)] = get_dict_handler(typestr)(v)
+                conf[str(k)] = registry.get_dict_handler(typestr)(v)
             else:
                 conf[str(k)] = v
-        return get_class(d["class"])(name=d["name"], config=conf)
+        return registry.get_class(d["class"])(name=d["name"], config=conf)
 
     def resolve_option(self, name, default=None):
         """
@@ -308,6 +372,18 @@ class Actor(Configurable, Stoppable):
         else:
             return None
 
+    @property
+    def buffer_budget(self):
+        """
+        Returns the budget for buffered output tokens that applies to this actor.
+
+        :return: the budget, None if not available
+        :rtype: BufferBudget
+        """
+        if self._parent is None:
+            return None
+        return self._parent.buffer_budget
+
     @property
     def root(self):
         """
@@ -509,6 +585,356 @@ class InputConsumer(Actor):
         self._input = token
 
 
+class BufferBudget(object):
+    """
+    Keeps track of the number of tokens (and their approximate size in bytes) that the output producers
+    of a flow are buffering, enforcing optional limits.
+    """
+
+    def __init__(self, max_tokens=0, max_bytes=0, policy="error", logger=None, spill_threshold=0, spill_dir=None):
+        """
+        Initializes the budget.
+
+        :param max_tokens: the maximum number of buffered tokens, 0 for unlimited
+        :type max_tokens: int
+        :param max_bytes: the maximum number of bytes for buffered tokens, 0 for unlimited
+        :type max_bytes: int
+        :param policy: what to do when exceeding the budget (error|warn|spill)
+        :type policy: str
+        :param logger: the logger to use for warnings
+        :type logger: logging.Logger
+        :param spill_threshold: the number of tokens in memory after which a buffer spills to disk, 0 for never
+        :type spill_threshold: int
+        :param spill_dir: the directory for the spill files, None for the system's temp directory
+        :type spill_dir: str
+        """
+        if policy not in ["error", "warn", "spill"]:
+            raise Exception("Unsupported policy: " + policy)
+        self.max_tokens = max_tokens
+        self.max_bytes = max_bytes
+        self.policy = policy
+        self.logger = logger
+        self.spill_threshold = spill_threshold
+        self.spill_dir = spill_dir
+        self.reset()
+
+    def reset(self):
+        """
+        Resets the counters.
+        """
+        self.tokens = 0
+        self.bytes = 0
+        self.peak_tokens = 0
+        self.peak_bytes = 0
+        self.spilled = 0
+        self._warned = False
+
+    def size_of(self, token):
+        """
+        Returns the approximate size of the token, only calculated if there is a limit on the bytes.
+
+        :param token: the token to get the size for
+        :type token: Token
+        :return: the size in bytes
+        :rtype: int
+        """
+        if self.max_bytes <= 0:
+            return 0
+        return sys.getsizeof(token.payload)
+
+    def is_exceeded(self):
+        """
+        Returns whether the budget is currently exceeded.
+
+        :return: True if exceeded
+        :rtype: bool
+        """
+        return ((self.max_tokens > 0) and (self.tokens > self.max_tokens)) \
+            or ((self.max_bytes > 0) and (self.bytes > self.max_bytes))
+
+    def must_spill(self, num_tokens, size):
+        """
+        Returns whether a buffer must spill the next token to disk.
+
+        :param num_tokens: the number of tokens that the buffer holds in memory
+        :type num_tokens: int
+        :param size: the size of the next token in bytes
+        :type size: int
+        :return: True if to spill
+        :rtype: bool
+        """
+        if (self.spill_threshold > 0) and (num_tokens >= self.spill_threshold):
+            return True
+        if self.policy == "spill":
+            return ((self.max_tokens > 0) and (self.tokens >= self.max_tokens)) \
+                or ((self.max_bytes > 0) and (self.bytes + size > self.max_bytes))
+        return False
+
+    def acquire(self, size, check=True):
+        """
+        Accounts for a token getting buffered. Raises an exception if the budget gets exceeded and
+        the policy is 'error'.
+
+        :param size: the size of the token in bytes
+        :type size: int
+        :param check: whether to check the budget
+        :type check: bool
+        """
+        self.tokens += 1
+        self.bytes += size
+        if check and (self.policy != "spill") and self.is_exceeded():
+            if self.policy == "error":
+                self.release(size)
+                raise Exception("Budget for buffered tokens exceeded: " + str(self))
+            if not self._warned:
+                self._warned = True
+                if self.logger is not None:
+                    self.logger.warning("Budget for buffered tokens exceeded: " + str(self))
+        if self.tokens > self.peak_tokens:
+            self.peak_tokens = self.tokens
+        if self.bytes > self.peak_bytes:
+            self.peak_bytes = self.bytes
+
+    def release(self, size):
+        """
+        Accounts for a buffered token getting removed.
+
+        :param size: the size of the token in bytes
+        :type size: int
+        """
+        self.tokens -= 1
+        self.bytes -= size
+
+    @property
+    def occupancy(self):
+        """
+        Returns the current and peak occupancy.
+
+        :return: the occupancy (tokens, bytes, peak_tokens, peak_bytes, spilled)
+        :rtype: dict
+        """
+        return {
+            "tokens": self.tokens,
+            "bytes": self.bytes,
+            "peak_tokens": self.peak_tokens,
+            "peak_bytes": self.peak_bytes,
+            "spilled": self.spilled,
+        }
+
+    def __str__(self):
+        """
+        Returns a short description of the budget.
+
+        :return: the description
+        :rtype: str
+        """
+        return "tokens=" + str(self.tokens) + "/" + str(self.max_tokens) \
+               + ", bytes=" + str(self.bytes) + "/" + str(self.max_bytes)
+
+
+class OutputBuffer(object):
+    """
+    FIFO buffer for the output tokens of an output producer, accounting for them in the budget (if any).
+    If the budget requires it, tokens get spilled to a temporary file (pickled) and read back in order.
+    Tokens that cannot be pickled (e.g., memoryviews) are kept in memory.
+    """
+
+    def __init__(self, budget=None):
+        """
+        Initializes the buffer.
+
+        :param budget: the budget to use, None for no budget
+        :type budget: BufferBudget
+        """
+        self._budget = budget
+        self._tokens = deque()
+        self._sizes = deque()
+        self._spill_file = None
+        self._spilled = 0
+        self._read_pos = 0
+        self._write_pos = 0
+        self._held = deque()
+        self._held_sizes = deque()
+
+    @property
+    def budget(self):
+        """
+        Returns the budget in use.
+
+        :return: the budget, None if not available
+        :rtype: BufferBudget
+        """
+        return self._budget
+
+    @property
+    def spilled(self):
+        """
+        Returns the number of tokens currently stored on disk.
+
+        :return: the number of tokens
+        :rtype: int
+        """
+        return self._spilled
+
+    def _spill(self, token):
+        """
+        Appends the token to the spill file.
+
+        :param token: the token to spill
+        :type token: Token
+        :return: whether the token could be spilled, i.e., pickled
+        :rtype: bool
+        """
+        import pickle
+        try:
+            data = pickle.dumps(token, protocol=pickle.HIGHEST_PROTOCOL)
+        except Exception:
+            return False
+        if self._spill_file is None:
+            import tempfile
+            self._spill_file = tempfile.TemporaryFile(dir=self._budget.spill_dir, prefix="simflow-", suffix=".spill")
+        self._spill_file.seek(self._write_pos)
+        self._spill_file.write(data)
+        self._write_pos = self._spill_file.tell()
+        self._spilled += 1
+        self._budget.spilled += 1
+        return True
+
+    def _hold(self, token, size):
+        """
+        Keeps a token that cannot be spilled in memory, after the spilled tokens.
+
+        :param token: the token to keep
+        :type token: Token
+        :param size: the size of the token in bytes
+        :type size: int
+        """
+        if (len(self._held) == 0) and (self._budget.logger is not None):
+            self._budget.logger.debug("Keeping token in memory that cannot be spilled: " + str(type(token.payload)))
+        self._budget.acquire(size, check=False)
+        self._held.append(token)
+        self._held_sizes.append(size)
+
+    def _unhold(self):
+        """
+        Moves the tokens kept in memory behind the spilled ones to the front once all spilled tokens got read.
+        """
+        self._tokens.extend(self._held)
+        self._sizes.extend(self._held_sizes)
+        self._held.clear()
+        self._held_sizes.clear()
+
+    def _refill(self):
+        """
+        Reads the next chunk of spilled tokens back into memory.
+        """
+        import pickle
+        if self._budget.spill_threshold > 0:
+            chunk_size = self._budget.spill_threshold
+        else:
+            chunk_size = REFILL_CHUNK_SIZE
+        self._spill_file.seek(self._read_pos)
+        while self._spilled > 0:
+            token = pickle.load(self._spill_file)
+            size = self._budget.size_of(token)
+            self._budget.acquire(size, check=False)
+            self._sizes.append(size)
+            self._tokens.append(token)
+            self._spilled -= 1
+            self._budget.spilled -= 1
+            # stop once the chunk is complete or the budget has been reached
+            if (len(self._tokens) >= chunk_size) or self._budget.must_spill(len(self._tokens), 0):
+                break
+        self._read_pos = self._spill_file.tell()
+        if self._spilled == 0:
+            self._spill_file.seek(0)
+            self._spill_file.truncate()
+            self._read_pos = 0
+            self._write_pos = 0
+
+    def append(self, token):
+        """
+        Adds the token at the end of the buffer.
+
+        :param token: the token to add
+        :type token: Token
+        """
+        if self._budget is not None:
+            size = self._budget.size_of(token)
+            if (self._spilled == 0) and (len(self._held) > 0):
+                self._unhold()
+            # once spilling, all further tokens have to go to disk (or behind the spilled ones) to keep their order
+            if (self._spilled > 0) or self._budget.must_spill(len(self._tokens), size):
+                if (len(self._held) == 0) and self._spill(token):
+                    return
+                if self._spilled > 0:
+                    self._hold(token, size)
+                    return
+                self._budget.acquire(size, check=False)
+            else:
+                self._budget.acquire(size)
+            self._sizes.append(size)
+        self._tokens.append(token)
+
+    def extend(self, tokens):
+        """
+        Adds the tokens at the end of the buffer.
+
+        :param tokens: the tokens to add
+        :type tokens: list
+        """
+        for token in tokens:
+            self.append(token)
+
+    def pop(self, index=0):
+        """
+        Removes and returns the first token. Only supports index 0.
+
+        :param index: the index of the token, must be 0
+        :type index: int
+        :return: the token
+        :rtype: Token
+        """
+        if index != 0:
+            raise Exception("Only the first token can be removed!")
+        if len(self._tokens) == 0:
+            if self._spilled > 0:
+                self._refill()
+            elif len(self._held) > 0:
+                self._unhold()
+        if self._budget is not None:
+            self._budget.release(self._sizes.popleft())
+        return self._tokens.popleft()
+
+    def clear(self):
+        """
+        Removes all tokens and the spill file.
+        """
+        if self._budget is not None:
+            while len(self._sizes) > 0:
+                self._budget.release(self._sizes.popleft())
+            while len(self._held_sizes) > 0:
+                self._budget.release(self._held_sizes.popleft())
+            self._budget.spilled -= self._spilled
+        self._tokens.clear()
+        self._held.clear()
+        if self._spill_file is not None:
+            self._spill_file.close()
+            self._spill_file = None
+        self._spilled = 0
+        self._read_pos = 0
+        self._write_pos = 0
+
+    def __len__(self):
+        """
+        Returns the number of buffered tokens.
+
+        :return: the number of tokens
+        :rtype: int
+        """
+        return len(self._tokens) + self._spilled + len(self._held)
+
+
 class OutputProducer(Actor):
     """
     Actors that generate output tokens inherit this class.
@@ -533,7 +959,12 @@ class OutputProducer(Actor):
         :return: None if successful, otherwise error message
         :rtype: str
         """
-        self._output = []
+        budget = self.buffer_budget
+        if (self._output is not None) and (self._output.budget is budget):
+            self._output.clear()
+        else:
+            self.clear_output()
+            self._output = OutputBuffer(budget)
         return None
 
     def has_output(self):
@@ -558,6 +989,21 @@ class OutputProducer(Actor):
             result = self._output.pop(0)
         return result
 
+    def clear_output(self):
+        """
+        Removes all pending output tokens.
+        """
+        if self._output is not None:
+            self._output.clear()
+
+    def wrapup(self):
+        """
+        Finishes up after execution finishes, does not remove any graphical output.
+        Removes any pending output tokens, releasing them from the budget.
+        """
+        self.clear_output()
+        super(OutputProducer, self).wrapup()
+
 
 class StorageHandler(object):
     """
@@ -661,3 +1107,7 @@ def is_sink(actor):
     :rtype: bool
     """
     return isinstance(actor, InputConsumer) and not isinstance(actor, OutputProducer)
+
+
+register_dict_handler("Configurable", Configurable.from_dict)
+register_dict_handler("Actor", Actor.from_dict)
@@ -0,0 +1,207 @@
+import argparse
+import logging
+import sys
+import time
+import traceback
+
+
+class ExecutionStats(object):
+    """
+    Collects the execution times of the actors of a flow, optionally also as trace events.
+    """
+
+    def __init__(self, trace=False):
+        """
+        Initializes the statistics.
+
+        :param trace: whether to record trace events
+        :type trace: bool
+        """
+        self._stats = dict()
+        self._events = [] if trace else None
+        self._start = time.perf_counter()
+
+    def instrument(self, actor):
+        """
+        Wraps the execute method of the actor and its sub-actors to record the execution times.
+
+        :param actor: the actor to instrument
+        :type actor: Actor
+        """
+        from simflow.control import ActorHandler
+
+        execute = actor.execute
+        stats = [0, 0.0]
+        self._stats[actor] = stats
+        events = self._events
+        origin = self._start
+
+        def timed_execute():
+            start = time.perf_counter()
+            result = execute()
+            end = time.perf_counter()
+            stats[0] += 1
+            stats[1] += end - start
+            if events is not None:
+                events.append({
+                    "name": actor.full_name,
+                    "cat": actor.__class__.__name__,
+                    "ph": "X",
+                    "ts": (start - origin) * 1e6,
+                    "dur": (end - start) * 1e6,
+                    "pid": 1,
+                    "tid": 1,
+                })
+            return result
+
+        actor.execute = timed_execute
+        if isinstance(actor, ActorHandler):
+            for sub in actor.actors:
+                self.instrument(sub)
+
+    def table(self):
+        """
+        Generates a table with the number of executions and the times per actor (in tree order).
+        The times of actor handlers include the ones of their sub-actors.
+
+        :return: the table
+        :rtype: str
+        """
+        names = [actor.full_name for actor in self._stats]
+        width = max([len("actor")] + [len(name) for name in names])
+        result = ["%-*s  %10s  %12s  %12s" % (width, "actor", "executions", "total [s]", "mean [ms]")]
+        for name, actor in zip(names, self._stats):
+            calls, total = self._stats[actor]
+            mean = (total / calls * 1000) if calls > 0 else 0.0
+            result.append("%-*s  %10d  %12.4f  %12.4f" % (width, name, calls, total, mean))
+        return "\n".join(result)
+
+    def write_trace(self, fname):
+        """
+        Writes the recorded trace events to a file in the Trace Event Format (JSON), which can be
+        viewed with chrome://tracing or https://ui.perfetto.dev.
+
+        :param fname: the file to write to
+        :type fname: str
+        """
+        import json
+        with open(fname, "w") as f:
+            json.dump({"traceEvents": self._events}, f)
+
+
+def run(ns):
+    """
+    Executes the 'run' command.
+
+    :param ns: the parsed options
+    :type ns: argparse.Namespace
+    :return: whether the flow executed successfully
+    :rtype: bool
+    """
+    from simflow.control import Flow, run_flow
+
+    flow = Flow.load(ns.flow, use_cache=ns.cache)
+    if ns.optimize:
+        import simflow.optimizer as optimizer
+        for rewrite in optimizer.optimize(flow):
+            print(rewrite)
+
+    stats = None
+    if ns.stats or (ns.trace is not None):
+        stats = ExecutionStats(trace=ns.trace is not None)
+        stats.instrument(flow)
+
+    profiler = None
+    if ns.profile is not None:
+        import cProfile
+        profiler = cProfile.Profile()
+
+    success = True
+    times = []
+    for i in range(ns.repeat):
+        start = time.perf_counter()
+        if profiler is not None:
+            profiler.enable()
+        msg = run_flow(flow, cleanup=(i == ns.repeat - 1), print_tree=ns.print_tree and (i == 0),
+                       resume=ns.resume and (i == 0))
+        if profiler is not None:
+            profiler.disable()
+        times.append(time.perf_counter() - start)
+        if (msg is not None) or (flow.director.num_errors > 0):
+            success = False
+            break
+        if ns.repeat > 1:
+            print("run %d: %.3fs" % (i + 1, times[-1]))
+
+    if len(times) > 1:
+        print("runs: %d, min: %.3fs, mean: %.3fs, max: %.3fs"
+              % (len(times), min(times), sum(times) / len(times), max(times)))
+    if ns.stats:
+        print(stats.table())
+    if ns.trace is not None:
+        stats.write_trace(ns.trace)
+    if profiler is not None:
+        profiler.dump_stats(ns.profile)
+    return success
+
+
+def main(args=None):
+    """
+    Runs the command-line interface.
+    Use -h to see all options.
+
+    :param args: the command-line arguments to use, uses sys.argv if None
+    :type args: list
+    :return: whether the command was successful
+    :rtype: bool
+    """
+    parser = argparse.ArgumentParser(
+        description="Command-line interface for simple-data-flow.",
+        prog="simflow")
+    parser.add_argument("--log_level", choices=["DEBUG", "INFO", "WARNING", "ERROR", "CRITICAL"], default="WARNING",
+                        help="the logging level to use")
+    subparsers = parser.add_subparsers(dest="command", required=True)
+
+    parser_run = subparsers.add_parser("run", help="executes a flow stored in a JSON file")
+    parser_run.add_argument("flow", help="the JSON file with the flow to execute")
+    parser_run.add_argument("-n", "--repeat", type=int, default=1,
+                            help="how often to execute the flow, e.g., for benchmarking")
+    parser_run.add_argument("--resume", action="store_true",
+                            help="resumes the flow from its last checkpoint, see 'checkpoint_file' option of the flow")
+    parser_run.add_argument("--optimize", action="store_true",
+                            help="optimizes the flow before executing it, outputs the rewrites")
+    parser_run.add_argument("--cache", action="store_true",
+                            help="uses the (signed) binary cache for loading the flow")
+    parser_run.add_argument("--print_tree", action="store_true",
+                            help="outputs the actor tree before executing the flow")
+    parser_run.add_argument("--stats", action="store_true",
+                            help="outputs a table with the number of executions and execution times per actor")
+    parser_run.add_argument("--trace", metavar="FILE", default=None,
+                            help="writes the executions of the actors to the file (Trace Event Format)")
+    parser_run.add_argument("--profile", metavar="FILE", default=None,
+                            help="profiles the execution with cProfile and writes the statistics to the file")
+    ns = parser.parse_args(args)
+
+    logging.basicConfig(level=ns.log_level)
+    if ns.command == "run":
+        return run(ns)
+    return False
+
+
+def sys_main():
+    """
+    Runs the main function using the system cli arguments, and
+    returns a system error code.
+
+    :return: 0 for success, 1 for failure.
+    :rtype: int
+    """
+    try:
+        return 0 if main() else 1
+    except Exception:
+        print(traceback.format_exc())
+        return 1
+
+
+if __name__ == "__main__":
+    sys.exit(sys_main())
@@ -1,11 +1,86 @@
 import re
 
+from array import array
 
-class Container(object):
+
+class AbstractContainer(object):
+    """
+    Ancestor for containers, without any storage of its own.
+    """
+
+    __slots__ = ()
+
+    def get(self, name):
+        """
+        Returns the stored data.
+
+        :param name: the name of the item to return
+        :type name: str
+        :return: the data
+        :rtype: object
+        """
+        raise Exception("Not implemented!")
+
+    def set(self, name, value):
+        """
+        Stores the given data (if not None).
+
+        :param name: the name of the item to store
+        :type name: str
+        :param value: the value to store
+        :type value: object
+        """
+        raise Exception("Not implemented!")
+
+    @property
+    def allowed(self):
+        """
+        Returns the all the allowed keys.
+
+        :return: the list of allowed keys.
+        :rtype: list
+        """
+        raise Exception("Not implemented!")
+
+    def is_valid(self):
+        """
+        Checks whether the container is valid.
+
+        :return: True if the container is valid
+        :rtype: bool
+        """
+        return True
+
+    def generate_help(self):
+        """
+        Generates a help string for this container.
+
+        :return: the help string
+        :rtype: str
+        """
+        result = list()
+        result.append(self.__class__.__name__)
+        result.append(re.sub(r'.', '=', self.__class__.__name__))
+        result.append("")
+        result.append("Supported value names:")
+        for a in self.allowed:
+            result.append(a)
+        return '\n'.join(result)
+
+    def print_help(self):
+        """
+        Prints a help string for this actor to stdout.
+        """
+        print(self.generate_help())
+
+
+class Container(AbstractContainer):
     """
     Container for storing multiple objects and passing them around together in the flow.
     """
 
+    __slots__ = ("_data", "_allowed")
+
     def __init__(self):
         """
         Initializes the container.
@@ -46,13 +121,125 @@ class Container(object):
         """
         return self._allowed
 
+    def __str__(self):
+        """
+        Returns the content of the container as string.
+
+        :return: the content
+        :rtype: str
+        """
+        return str(self._data)
+
+
+class FixedContainer(AbstractContainer):
+    """
+    Ancestor for containers with a fixed list of value names, which get generated with the
+    container_class function. Each value is stored in a slot of its own, with the indices of the
+    names shared by all instances of the class.
+    """
+
+    __slots__ = ()
+
+    _fields = []
+    """ the supported value names """
+
+    _indices = {}
+    """ the index per value name """
+
+    _slots = []
+    """ the slot descriptors of the values, in the order of the value names """
+
+    _required = []
+    """ the indices of the values that must be present for a valid container """
+
+    _required_names = []
+    """ the value names that must be present for a valid container """
+
+    def __init__(self, values=None):
+        """
+        Initializes the container.
+
+        :param values: the optional values, in the order of the value names
+        :type values: list
+        """
+        if values is None:
+            for slot in self._slots:
+                slot.__set__(self, None)
+        else:
+            if len(values) != len(self._slots):
+                raise Exception("Expected " + str(len(self._slots)) + " values, but got: " + str(len(values)))
+            for slot, value in zip(self._slots, values):
+                slot.__set__(self, value)
+
+    @classmethod
+    def index(cls, name):
+        """
+        Returns the index of the value name.
+
+        :param name: the name of the item
+        :type name: str
+        :return: the index, -1 if not supported
+        :rtype: int
+        """
+        return cls._indices.get(name, -1)
+
+    def get(self, name):
+        """
+        Returns the stored data.
+
+        :param name: the name of the item to return
+        :type name: str
+        :return: the data, None if not set
+        :rtype: object
+        """
+        return self._slots[self._indices[name]].__get__(self)
+
+    def get_at(self, index):
+        """
+        Returns the stored data at the specified index.
+
+        :param index: the index of the item to return
+        :type index: int
+        :return: the data, None if not set
+        :rtype: object
+        """
+        return self._slots[index].__get__(self)
+
+    def set(self, name, value):
+        """
+        Stores the given data (if not None).
+
+        :param name: the name of the item to store
+        :type name: str
+        :param value: the value to store
+        :type value: object
+        """
+        if value is not None:
+            index = self._indices.get(name)
+            if index is None:
+                raise Exception("Unsupported value name for " + self.__class__.__name__ + ": " + str(name))
+            self._slots[index].__set__(self, value)
+
+    @property
+    def allowed(self):
+        """
+        Returns the all the allowed keys.
+
+        :return: the list of allowed keys.
+        :rtype: list
+        """
+        return self._fields
+
     def is_valid(self):
         """
-        Checks whether the container is valid.
+        Checks whether the container is valid, i.e., whether all required values are present.
 
         :return: True if the container is valid
         :rtype: bool
         """
+        for index in self._required:
+            if self._slots[index].__get__(self) is None:
+                return False
         return True
 
     def __str__(self):
@@ -62,26 +249,306 @@ class Container(object):
         :return: the content
         :rtype: str
         """
-        return str(self._data)
+        data = {}
+        for name, slot in zip(self._fields, self._slots):
+            value = slot.__get__(self)
+            if value is not None:
+                data[name] = value
+        return str(data)
 
-    def generate_help(self):
+    def __reduce__(self):
         """
-        Generates a help string for this container.
+        Returns the information for pickling the container, which gets restored via the
+        container_class function, as the generated classes are not available from the module.
 
-        :return: the help string
+        :return: the callable and its arguments
+        :rtype: tuple
+        """
+        values = [slot.__get__(self) for slot in self._slots]
+        return _restore_container, (self.__class__.__name__, self._fields, self._required_names, values)
+
+
+_container_classes = {}
+""" the cache for the generated container classes """
+
+
+def container_class(name, fields, required=None):
+    """
+    Returns a container class with the fixed list of value names. Classes get cached, i.e.,
+    calling this function with the same parameters returns the same class.
+
+    :param name: the name of the class
+    :type name: str
+    :param fields: the value names
+    :type fields: list
+    :param required: the value names that must be present for a valid container, None if all optional
+    :type required: list
+    :return: the class, derived from FixedContainer
+    :rtype: type
+    """
+    fields = [str(x) for x in fields]
+    if required is None:
+        required = []
+    key = (name, tuple(fields), tuple(required))
+    if key in _container_classes:
+        return _container_classes[key]
+
+    indices = {}
+    for i, field in enumerate(fields):
+        if field in indices:
+            raise Exception("Duplicate value name: " + field)
+        indices[field] = i
+    for field in required:
+        if field not in indices:
+            raise Exception("Required value name not in list of value names: " + str(field))
+    slots = ["_v" + str(i) for i in range(len(fields))]
+    result = type(str(name), (FixedContainer,), {
+        "__slots__": tuple(slots),
+        "_fields": fields,
+        "_indices": indices,
+        "_required": [indices[x] for x in required],
+        "_required_names": list(required),
+    })
+    result._slots = [getattr(result, x) for x in slots]
+    _container_classes[key] = result
+    return result
+
+
+def _restore_container(name, fields, required, values):
+    """
+    Restores a container of a class generated by the container_class function, used for unpickling.
+
+    :param name: the name of the class
+    :type name: str
+    :param fields: the value names
+    :type fields: list
+    :param required: the value names that must be present for a valid container
+    :type required: list
+    :param values: the values, in the order of the value names
+    :type values: list
+    :return: the container
+    :rtype: FixedContainer
+    """
+    return container_class(name, fields, required=required)(values)
+
+
+def unique_names(names):
+    """
+    Makes the value names unique by appending a suffix to repeated names, e.g., 'a', 'a_2', 'a_3'.
+
+    :param names: the value names
+    :type names: list
+    :return: the unique names
+    :rtype: list
+    """
+    result = []
+    used = set()
+    for name in [str(x) for x in names]:
+        unique = name
+        i = 1
+        while unique in used:
+            i += 1
+            unique = name + "_" + str(i)
+        used.add(unique)
+        result.append(unique)
+    return result
+
+
+class ContainerBatch(object):
+    """
+    Stores multiple records column-wise, i.e., one column (list, array or NumPy array) per value name.
+    Using 'get' returns the complete column.
+    """
+
+    def __init__(self, columns=None):
+        """
+        Initializes the batch.
+
+        :param columns: the columns (name -> list/array), all of the same length
+        :type columns: dict
+        """
+        self._columns = {}
+        self._size = None
+        if columns is not None:
+            for name in columns:
+                self.set(name, columns[name])
+
+    def get(self, name):
+        """
+        Returns the column.
+
+        :param name: the name of the column to return
+        :type name: str
+        :return: the column
+        :rtype: object
+        """
+        return self._columns[name]
+
+    def set(self, name, column):
+        """
+        Stores the given column (if not None).
+
+        :param name: the name of the column to store
+        :type name: str
+        :param column: the column to store (list, array or NumPy array)
+        :type column: object
+        """
+        if column is None:
+            return
+        if (self._size is not None) and (len(column) != self._size):
+            raise Exception("Column '" + str(name) + "' has " + str(len(column)) + " rows, expected: " + str(self._size))
+        self._size = len(column)
+        self._columns[name] = column
+
+    @property
+    def allowed(self):
+        """
+        Returns the names of the columns.
+
+        :return: the list of names
+        :rtype: list
+        """
+        return list(self._columns.keys())
+
+    def is_valid(self):
+        """
+        Checks whether the batch is valid.
+
+        :return: True if the batch is valid
+        :rtype: bool
+        """
+        return True
+
+    def __len__(self):
+        """
+        Returns the number of rows in the batch.
+
+        :return: the number of rows
+        :rtype: int
+        """
+        if self._size is None:
+            return 0
+        return self._size
+
+    def __str__(self):
+        """
+        Returns the dimensions of the batch as string.
+
+        :return: the dimensions
         :rtype: str
         """
-        result = list()
-        result.append(self.__class__.__name__)
-        result.append(re.sub(r'.', '=', self.__class__.__name__))
-        result.append("")
-        result.append("Supported value names:")
-        for a in self.allowed:
-            result.append(a)
-        return '\n'.join(result)
+        return self.__class__.__name__ + ": rows=" + str(len(self)) + ", columns=" + str(self.allowed)
 
-    def print_help(self):
+    @classmethod
+    def _to_column(cls, values, use_numpy):
         """
-        Prints a help string for this actor to stdout.
+        Turns the list of values into a column, using compact arrays for numeric values.
+
+        :param values: the values to convert
+        :type values: list
+        :param use_numpy: whether to generate NumPy arrays
+        :type use_numpy: bool
+        :return: the column
+        :rtype: object
         """
-        print(self.generate_help())
+        if use_numpy:
+            try:
+                import numpy
+            except ImportError:
+                raise Exception("NumPy is not installed!")
+            return numpy.asarray(values)
+
+        typecode = None
+        for value in values:
+            if isinstance(value, bool) or not isinstance(value, (int, float)):
+                return values
+            if isinstance(value, float):
+                typecode = "d"
+            elif typecode is None:
+                typecode = "q"
+        if typecode is None:
+            return values
+        try:
+            return array(typecode, values)
+        except OverflowError:
+            return values
+
+    @classmethod
+    def from_containers(cls, containers, fields=None, use_numpy=False):
+        """
+        Turns the containers into a batch. Missing values are stored as None.
+
+        :param containers: the containers to convert
+        :type containers: list
+        :param fields: the value names to use, None for all the names present in the containers
+        :type fields: list
+        :param use_numpy: whether to generate NumPy arrays instead of lists/arrays
+        :type use_numpy: bool
+        :return: the batch
+        :rtype: ContainerBatch
+        """
+        if fields is None:
+            fields = []
+            names = set()
+            for cont in containers:
+                if isinstance(cont, FixedContainer):
+                    keys = cont.allowed
+                else:
+                    keys = cont._data.keys()
+                for key in keys:
+                    if key not in names:
+                        names.add(key)
+                        fields.append(key)
+
+        columns = {}
+        for field in fields:
+            columns[field] = []
+        for cont in containers:
+            if isinstance(cont, FixedContainer):
+                for field in fields:
+                    index = cont.index(field)
+                    columns[field].append(None if index == -1 else cont.get_at(index))
+            else:
+                for field in fields:
+                    columns[field].append(cont._data.get(field))
+
+        result = ContainerBatch()
+        result._size = len(containers)
+        for field in fields:
+            result.set(field, cls._to_column(columns[field], use_numpy))
+        return result
+
+    def row(self, index):
+        """
+        Returns the specified row as container.
+
+        :param index: the 0-based row index
+        :type index: int
+        :return: the container
+        :rtype: FixedContainer
+        """
+        fields = self.allowed
+        values = []
+        for field in fields:
+            value = self._columns[field][index]
+            if hasattr(value, "item"):
+                value = value.item()
+            values.append(value)
+        return container_class("BatchRow", fields)(values)
+
+    def to_containers(self):
+        """
+        Turns the batch back into containers, one per row.
+
+        :return: the list of containers
+        :rtype: list
+        """
+        fields = self.allowed
+        cls = container_class("BatchRow", fields)
+        columns = []
+        for field in fields:
+            column = self._columns[field]
+            if hasattr(column, "tolist"):
+                column = column.tolist()
+            columns.append(column)
+        return [cls(list(values)) for values in zip(*columns)] if len(fields) > 0 else []
@@ -1,9 +1,24 @@
+import copy
+import json
+import os
+import sys
+import time
 import simflow.base as base
+import simflow.registry as registry
 
-from confobj import has_dict_handler, register_dict_handler, get_dict_handler
+from collections import OrderedDict
+
+from confobj import register_dict_handler
 from simflow.base import Actor, InputConsumer, OutputProducer, Stoppable, StorageHandler, Token
+from simflow.container import FixedContainer
 from simflow.transformer import Transformer
 
+FLOW_CACHE_MAGIC = b"SIMFLOW-FLOW-CACHE-1\n"
+""" the header of the binary caches of flows """
+
+FLOW_CACHE_KEY_FILE = os.path.join(os.path.expanduser("~"), ".simflow", "cache.key")
+""" the file with the secret for authenticating the binary caches of flows, gets generated if missing """
+
 
 class ActorHandler(Actor):
     """
@@ -21,8 +36,6 @@ class ActorHandler(Actor):
         """
         super(ActorHandler, self).__init__(name=name, config=config)
         self._director = self.new_director()
-        if not has_dict_handler("ActorHandler"):
-            register_dict_handler("ActorHandler", ActorHandler.from_dict)
 
     def new_director(self):
         """
@@ -33,6 +46,16 @@ class ActorHandler(Actor):
         """
         raise Exception("Not implemented!")
 
+    @property
+    def director(self):
+        """
+        Returns the director that handles the sub-actors.
+
+        :return: the director
+        :rtype: Director
+        """
+        return self._director
+
     def default_actors(self):
         """
         Returns the default actors to use.
@@ -103,7 +126,7 @@ class ActorHandler(Actor):
                     typestr = e[u"type"]
                 else:
                     typestr = e["type"]
-                result.actors.append(get_dict_handler(typestr)(e))
+                result.actors.append(registry.get_dict_handler(typestr)(e))
         return result
 
     @property
@@ -239,6 +262,16 @@ class ActorHandler(Actor):
         """
         return self._director.execute()
 
+    def iteration_finished(self, pending):
+        """
+        Gets called by the director whenever a token has made its way through the sub-actors
+        (or got dropped along the way).
+
+        :param pending: the sub-actors that still have output pending
+        :type pending: list
+        """
+        pass
+
     def stop_execution(self):
         """
         Triggers the stopping of the actor.
@@ -306,6 +339,9 @@ class ActorHandler(Actor):
         return '\n'.join(content)
 
 
+register_dict_handler("ActorHandler", ActorHandler.from_dict)
+
+
 class Director(object):
     """
     Ancestor for classes that "direct" the flow of tokens.
@@ -320,6 +356,9 @@ class Director(object):
         """
         self.check_owner(owner)
         self._owner = owner
+        self._runs = 0
+        self._drop_before = None
+        self._starts_stream = False
 
     def __str__(self):
         """
@@ -343,6 +382,47 @@ class Director(object):
         """
         return self._owner
 
+    @property
+    def runs(self):
+        """
+        Returns how often the director has been executed.
+
+        :return: the number of executions
+        :rtype: int
+        """
+        return self._runs
+
+    @property
+    def starts_stream(self):
+        """
+        Obtains whether each execution of the director starts a new stream of tokens, e.g., from a source
+        or from the payload of a CompiledFlow. Actors like Limit count their tokens per stream.
+
+        :return: true if starting a new stream
+        :rtype: bool
+        """
+        return self._starts_stream
+
+    @starts_stream.setter
+    def starts_stream(self, starts):
+        """
+        Sets whether each execution of the director starts a new stream of tokens.
+
+        :param starts: true if starting a new stream
+        :type starts: bool
+        """
+        self._starts_stream = starts
+
+    def drop_pending(self, actor):
+        """
+        Requests that the pending output of all actors preceding the specified actor gets dropped,
+        i.e., that no further tokens get produced upstream. Directors that do not support this ignore it.
+
+        :param actor: the actor requesting the drop
+        :type actor: Actor
+        """
+        self._drop_before = actor.index
+
     def check_owner(self, owner):
         """
         Checks the owner. Raises an exception if invalid.
@@ -402,6 +482,7 @@ class SequentialDirector(Director, Stoppable):
         self._allow_source = False
         self._record_output = True
         self._recorded_output = []
+        self._num_errors = 0
 
     @property
     def allow_source(self):
@@ -453,6 +534,35 @@ class SequentialDirector(Director, Stoppable):
         """
         return self._recorded_output
 
+    def clear_recorded_output(self):
+        """
+        Removes all recorded output.
+        """
+        self._recorded_output = []
+
+    @property
+    def num_errors(self):
+        """
+        Returns the number of errors that sub-actors generated during the last execution.
+
+        :return: the number of errors
+        :rtype: int
+        """
+        return self._num_errors
+
+    def report_error(self, actor, msg):
+        """
+        Records an error that a sub-actor generated, e.g., while producing its output tokens outside
+        its execution.
+
+        :param actor: the actor that generated the error
+        :type actor: Actor
+        :param msg: the error message
+        :type msg: str
+        """
+        self._num_errors += 1
+        self.owner.logger.error(actor.full_name + " generated following error output:\n" + msg)
+
     def stop_execution(self):
         """
         Triggers the stopping of the object.
@@ -528,13 +638,37 @@ class SequentialDirector(Director, Stoppable):
         :return: None if successful, otherwise error message
         :rtype: str
         """
+        iterator = self.iterate()
+        while True:
+            try:
+                token = next(iterator)
+            except StopIteration as e:
+                return e.value
+            if self._record_output:
+                self._recorded_output.append(token)
+
+    def iterate(self):
+        """
+        Executes the actors, yielding the tokens of the last active actor as soon as they get generated.
+        Closing the generator stops the execution. The generator returns None if successful, otherwise
+        the error message.
+
+        :return: generator for the output tokens
+        """
 
         self._stopped = False
         self._stopping = False
+        self._runs += 1
+        self._drop_before = None
         not_finished_actor = self.owner.first_active
         pending_actors = []
         finished = False
         actor_result = None
+        self._num_errors = 0
+        actors = self.owner.actors
+        last_active = -1
+        if self.owner.active > 0:
+            last_active = self.owner.last_active.index
 
         while not (self.is_stopping() or self.is_stopped()) and not finished:
             # determing starting point of next iteration
@@ -546,15 +680,12 @@ class SequentialDirector(Director, Stoppable):
 
             # iterate over actors
             token = None
-            last_active = -1
-            if self.owner.active > 0:
-                last_active = self.owner.last_active.index
             for i in range(start_index, last_active + 1):
                 # do we have to stop the execution?
                 if self.is_stopped() or self.is_stopping():
                     break
 
-                curr = self.owner.actors[i]
+                curr = actors[i]
                 if curr.skip:
                     continue
 
@@ -565,8 +696,7 @@ class SequentialDirector(Director, Stoppable):
                     else:
                         actor_result = curr.execute()
                         if actor_result is not None:
-                            self.owner.logger.error(
-                                curr.full_name + " generated following error output:\n" + actor_result)
+                            self.report_error(curr, actor_result)
                             break
 
                     if isinstance(curr, OutputProducer) and curr.has_output():
@@ -583,8 +713,7 @@ class SequentialDirector(Director, Stoppable):
                     curr.input = token
                     actor_result = curr.execute()
                     if actor_result is not None:
-                        self.owner.logger.error(
-                            curr.full_name + " generated following error output:\n" + actor_result)
+                        self.report_error(curr, actor_result)
                         break
 
                     # was a new token produced?
@@ -600,17 +729,30 @@ class SequentialDirector(Director, Stoppable):
                     else:
                         token = None
 
-                # token from last actor generated? -> store
-                if (i == self.owner.last_active.index) and (token is not None):
-                    if self._record_output:
-                        self._recorded_output.append(token)
+                # token from last actor generated? -> pass on
+                if (i == last_active) and (token is not None):
+                    try:
+                        yield token
+                    except GeneratorExit:
+                        self.stop_execution()
+                        raise
 
                 # no token produced, ignore rest of actors
                 if isinstance(curr, OutputProducer) and (token is None):
                     break
 
+            # drop pending output upstream?
+            if self._drop_before is not None:
+                for actor in pending_actors:
+                    if actor.index < self._drop_before:
+                        actor.clear_output()
+                pending_actors = [actor for actor in pending_actors if actor.index >= self._drop_before]
+                self._drop_before = None
+
             # all actors finished?
             finished = (not_finished_actor is None) and (len(pending_actors) == 0)
+            if actor_result is None:
+                self.owner.iteration_finished(pending_actors)
 
         return actor_result
 
@@ -631,6 +773,14 @@ class Flow(ActorHandler, StorageHandler):
         """
         super(Flow, self).__init__(name=name, config=config)
         self._storage = {}
+        self._rewrites = []
+        self._snapshot_file = None
+        self._snapshot_interval = 0
+        self._last_snapshot = None
+        self._checkpoint_file = None
+        self._checkpoint_interval = 0
+        self._last_checkpoint = None
+        self._buffer_budget = None
 
     def description(self):
         """
@@ -641,6 +791,306 @@ class Flow(ActorHandler, StorageHandler):
         """
         return "Root actor for defining and executing flows."
 
+    def fix_config(self, options):
+        """
+        Fixes the options, if necessary. I.e., it adds all required elements to the dictionary.
+
+        :param options: the options to fix
+        :type options: dict
+        :return: the (potentially) fixed options
+        :rtype: dict
+        """
+        options = super(Flow, self).fix_config(options)
+
+        opt = "storage"
+        if opt not in options:
+            options[opt] = None
+        if opt not in self.help:
+            self.help[opt] = "The storage backend to use instead of a plain dictionary, None for the "\
+                             "dictionary; gets closed when the flow wraps up (values remain available) and destroyed "\
+                             "when the flow gets cleaned up (Storage)."
+
+        opt = "snapshot_file"
+        if opt not in options:
+            options[opt] = ""
+        if opt not in self.help:
+            self.help[opt] = "The file to write snapshots of the storage to (and restore them from); no "\
+                             "snapshots if empty (string)."
+
+        opt = "snapshot_interval"
+        if opt not in options:
+            options[opt] = 0
+        if opt not in self.help:
+            self.help[opt] = "The interval in seconds for writing snapshots of the storage during execution; 0 "\
+                             "only writes a snapshot when the flow finishes (float)."
+
+        opt = "restore_snapshot"
+        if opt not in options:
+            options[opt] = True
+        if opt not in self.help:
+            self.help[opt] = "Whether to restore the storage from the snapshot file during setup, if it "\
+                             "exists (bool)."
+
+        opt = "checkpoint_file"
+        if opt not in options:
+            options[opt] = ""
+        if opt not in self.help:
+            self.help[opt] = "The file to write the position of the source to, for resuming the flow after a "\
+                             "restart; no checkpoints if empty (string)."
+
+        opt = "checkpoint_interval"
+        if opt not in options:
+            options[opt] = 10.0
+        if opt not in self.help:
+            self.help[opt] = "The interval in seconds for writing checkpoints; 0 writes a checkpoint whenever a "\
+                             "token has made its way through the flow (float)."
+
+        opt = "max_buffered_tokens"
+        if opt not in options:
+            options[opt] = 0
+        if opt not in self.help:
+            self.help[opt] = "The maximum number of output tokens that all actors together can buffer, 0 for "\
+                             "unlimited (int)."
+
+        opt = "max_buffered_bytes"
+        if opt not in options:
+            options[opt] = 0
+        if opt not in self.help:
+            self.help[opt] = "The maximum approximate size in bytes of the payloads of all buffered output "\
+                             "tokens, 0 for unlimited (int)."
+
+        opt = "buffer_policy"
+        if opt not in options:
+            options[opt] = "error"
+        if opt not in self.help:
+            self.help[opt] = "What to do when the budget for buffered tokens gets exceeded: error|warn|spill, "\
+                             "with spill writing further tokens to disk (str)."
+
+        opt = "spill_threshold"
+        if opt not in options:
+            options[opt] = 0
+        if opt not in self.help:
+            self.help[opt] = "The number of tokens an actor can buffer in memory before further tokens get "\
+                             "written to disk, 0 for never (int)."
+
+        opt = "spill_dir"
+        if opt not in options:
+            options[opt] = ""
+        if opt not in self.help:
+            self.help[opt] = "The directory for the files with spilled tokens, uses the system's temp directory "\
+                             "if empty (str)."
+
+        opt = "optimize"
+        if opt not in options:
+            options[opt] = False
+        if opt not in self.help:
+            self.help[opt] = "Whether to optimize the actor tree (in place) during setup, e.g., removing skipped "\
+                             "and PassThrough actors, flattening and fusing actors (bool)."
+
+        return options
+
+    @property
+    def rewrites(self):
+        """
+        Returns the rewrites that the optimizer performed during the last setup.
+
+        :return: the list of rewrites
+        :rtype: list
+        """
+        return self._rewrites
+
+    def setup(self):
+        """
+        Configures the actor before execution.
+
+        :return: None if successful, otherwise error message
+        :rtype: str
+        """
+        self._rewrites = []
+        if bool(self.resolve_option("optimize")):
+            try:
+                import simflow.optimizer as optimizer
+                self._rewrites = optimizer.optimize(self)
+            except Exception as e:
+                return "Failed to optimize flow: " + str(e)
+            for rewrite in self._rewrites:
+                self.logger.info(rewrite)
+        try:
+            self._buffer_budget = base.BufferBudget(
+                max_tokens=int(self.resolve_option("max_buffered_tokens")),
+                max_bytes=int(self.resolve_option("max_buffered_bytes")),
+                policy=str(self.resolve_option("buffer_policy")),
+                logger=self.logger,
+                spill_threshold=int(self.resolve_option("spill_threshold")),
+                spill_dir=str(self.resolve_option("spill_dir")) or None)
+        except Exception as e:
+            return str(e)
+        result = super(Flow, self).setup()
+        if result is None:
+            result = self._setup_snapshots()
+        if result is None:
+            self._checkpoint_file = str(self.resolve_option("checkpoint_file"))
+            if len(self._checkpoint_file) == 0:
+                self._checkpoint_file = None
+            self._checkpoint_interval = float(self.resolve_option("checkpoint_interval"))
+            self._last_checkpoint = time.time()
+        return result
+
+    def _setup_snapshots(self):
+        """
+        Configures the storage snapshots and restores the last snapshot, if necessary.
+
+        :return: None if successful, otherwise error message
+        :rtype: str
+        """
+        self._snapshot_file = str(self.resolve_option("snapshot_file"))
+        if len(self._snapshot_file) == 0:
+            self._snapshot_file = None
+            return None
+        self._snapshot_interval = float(self.resolve_option("snapshot_interval"))
+        self._last_snapshot = time.time()
+        if bool(self.resolve_option("restore_snapshot")) and os.path.exists(self._snapshot_file):
+            try:
+                import simflow.storage as storage
+                values = storage.load_snapshot(self._snapshot_file)
+            except Exception as e:
+                return "Failed to restore storage snapshot from '" + self._snapshot_file + "': " + str(e)
+            for key in values:
+                self.storage[key] = values[key]
+            self.logger.info("Restored " + str(len(values)) + " storage value(s) from: " + self._snapshot_file)
+        return None
+
+    def save_snapshot(self):
+        """
+        Writes a snapshot of the storage to the snapshot file, if one is set.
+
+        :return: None if successful, otherwise error message
+        :rtype: str
+        """
+        if self._snapshot_file is None:
+            return None
+        self._last_snapshot = time.time()
+        try:
+            import simflow.storage as storage
+            skipped = storage.save_snapshot(self.storage, self._snapshot_file)
+        except Exception as e:
+            return "Failed to write storage snapshot to '" + self._snapshot_file + "': " + str(e)
+        if len(skipped) > 0:
+            self.logger.warning("Storage values that cannot be pickled were not saved: " + ", ".join(skipped))
+        return None
+
+    @property
+    def checkpoint_source(self):
+        """
+        Returns the source whose position gets checkpointed, i.e., the first active actor if it is a source.
+
+        :return: the source, None if not available
+        :rtype: Source
+        """
+        first = self.first_active
+        if base.is_source(first) and hasattr(first, "position"):
+            return first
+        return None
+
+    def save_checkpoint(self):
+        """
+        Writes the current position of the source to the checkpoint file, if one is set.
+        Also writes a storage snapshot, to keep storage and position in sync.
+
+        :return: None if successful, otherwise error message
+        :rtype: str
+        """
+        if self._checkpoint_file is None:
+            return None
+        source = self.checkpoint_source
+        if source is None:
+            return None
+        self._last_checkpoint = time.time()
+        tmp = self._checkpoint_file + ".tmp"
+        try:
+            with open(tmp, "w") as f:
+                json.dump({"source": source.full_name, "position": source.position}, f)
+            os.replace(tmp, self._checkpoint_file)
+        except Exception as e:
+            return "Failed to write checkpoint to '" + self._checkpoint_file + "': " + str(e)
+        return self.save_snapshot()
+
+    def resume_from_checkpoint(self):
+        """
+        Makes the source resume from the position stored in the checkpoint file, if it exists.
+        Must be called after setup.
+
+        :return: None if successful, otherwise error message
+        :rtype: str
+        """
+        if (self._checkpoint_file is None) or not os.path.exists(self._checkpoint_file):
+            return None
+        source = self.checkpoint_source
+        if source is None:
+            return "No source available for resuming from checkpoint!"
+        try:
+            with open(self._checkpoint_file, "r") as f:
+                checkpoint = json.load(f)
+        except Exception as e:
+            return "Failed to read checkpoint from '" + self._checkpoint_file + "': " + str(e)
+        if checkpoint["source"] != source.full_name:
+            return "Checkpoint is for source '" + checkpoint["source"] + "', but flow starts with '" \
+                   + source.full_name + "'!"
+        source.resume_from(checkpoint["position"])
+        self.logger.info("Resuming " + source.full_name + " from position: " + str(checkpoint["position"]))
+        return None
+
+    def clear_checkpoint(self):
+        """
+        Removes the checkpoint file, e.g., after the flow finished successfully.
+        """
+        if (self._checkpoint_file is not None) and os.path.exists(self._checkpoint_file):
+            os.remove(self._checkpoint_file)
+
+    def iteration_finished(self, pending):
+        """
+        Gets called by the director whenever a token has made its way through the sub-actors
+        (or got dropped along the way). Writes checkpoints and storage snapshots, if necessary.
+
+        :param pending: the sub-actors that still have output pending
+        :type pending: list
+        """
+        now = time.time()
+        # checkpoints are only consistent if no tokens from the source are still in flight,
+        # after an error the position of the failed token is kept
+        if (self._checkpoint_file is not None) and (self._director.num_errors == 0) \
+                and (now - self._last_checkpoint >= self._checkpoint_interval) \
+                and ((len(pending) == 0) or ((len(pending) == 1) and (pending[0] is self.first_active))):
+            msg = self.save_checkpoint()
+            if msg is not None:
+                self.logger.error(msg)
+        elif (self._snapshot_file is not None) and (self._snapshot_interval > 0) \
+                and (now - self._last_snapshot >= self._snapshot_interval):
+            msg = self.save_snapshot()
+            if msg is not None:
+                self.logger.error(msg)
+
+    def wrapup(self):
+        """
+        Finishes up after execution finishes, does not remove any graphical output.
+        Writes a final storage snapshot, if necessary. In case of errors, the snapshot that matches
+        the last checkpoint is kept. Closes the storage backend, if any, releasing its external resources
+        (its values remain available).
+        """
+        super(Flow, self).wrapup()
+        budget = self._buffer_budget
+        if (budget is not None) and ((budget.max_tokens > 0) or (budget.max_bytes > 0)):
+            self.logger.info("Peak buffered tokens: " + str(budget.peak_tokens) + ", bytes: " + str(budget.peak_bytes))
+        if (budget is not None) and (budget.spill_threshold > 0 or budget.policy == "spill"):
+            self.logger.info("Tokens still spilled to disk: " + str(budget.spilled))
+        if (self._checkpoint_file is None) or (self._director.num_errors == 0):
+            msg = self.save_snapshot()
+            if msg is not None:
+                self.logger.error(msg)
+        backend = self.config["storage"]
+        if backend is not None:
+            backend.close()
+
     def new_director(self):
         """
         Creates the director to use for handling the sub-actors.
@@ -651,6 +1101,7 @@ class Flow(ActorHandler, StorageHandler):
         result = SequentialDirector(self)
         result.record_output = False
         result.allow_source = True
+        result.starts_stream = True
         return result
 
     def check_actors(self, actors):
@@ -668,26 +1119,222 @@ class Flow(ActorHandler, StorageHandler):
     @property
     def storage(self):
         """
-        Returns the internal storage.
+        Returns the internal storage, i.e., the storage backend if set, otherwise the dictionary.
 
         :return: the internal storage
         :rtype: dict
         """
-        return self._storage
+        backend = self.config["storage"]
+        if backend is None:
+            return self._storage
+        return backend
+
+    @property
+    def buffer_budget(self):
+        """
+        Returns the budget for buffered output tokens of the flow.
+
+        :return: the budget, None if not set up
+        :rtype: BufferBudget
+        """
+        return self._buffer_budget
+
+    @property
+    def buffer_occupancy(self):
+        """
+        Returns the current and peak number (and size) of the output tokens buffered in the flow.
+
+        :return: the occupancy (tokens, bytes, peak_tokens, peak_bytes), None if not set up
+        :rtype: dict
+        """
+        if self._buffer_budget is None:
+            return None
+        return self._buffer_budget.occupancy
+
+    def iter_results(self):
+        """
+        Sets up and executes the flow, yielding the tokens of the last active actor as soon as they get
+        generated instead of collecting them. Closing the generator early (e.g., leaving a for loop) stops
+        the execution. The flow gets wrapped up at the end. Raises an exception if setup or execution fails.
+
+        :return: generator for the output tokens
+        """
+        msg = self.setup()
+        if msg is not None:
+            self.wrapup()
+            raise Exception("Error setting up flow:\n" + msg)
+        try:
+            msg = self.pre_execute()
+            if msg is None:
+                msg = yield from self._director.iterate()
+            if msg is None:
+                msg = self.post_execute()
+        finally:
+            self.wrapup()
+        if msg is not None:
+            raise Exception("Error executing flow:\n" + msg)
+
+    def cleanup(self):
+        """
+        Destructive finishing up after execution stopped. Destroys the storage backend, if any.
+        """
+        super(Flow, self).cleanup()
+        backend = self.config["storage"]
+        if backend is not None:
+            backend.destroy()
 
     @classmethod
-    def load(cls, fname):
+    def _cache_secret(cls):
         """
-        Loads the flow from a JSON file.
+        Returns the secret for authenticating the binary caches, generates it if necessary.
+        The secret file must only be accessible by the user.
+
+        :return: the secret, None if not available
+        :rtype: bytes
+        """
+        try:
+            if not os.path.exists(FLOW_CACHE_KEY_FILE):
+                os.makedirs(os.path.dirname(FLOW_CACHE_KEY_FILE), mode=0o700, exist_ok=True)
+                fd = os.open(FLOW_CACHE_KEY_FILE, os.O_WRONLY | os.O_CREAT | os.O_EXCL, 0o600)
+                with os.fdopen(fd, "wb") as f:
+                    f.write(os.urandom(32))
+            if (os.name == "posix") and (os.stat(FLOW_CACHE_KEY_FILE).st_mode & 0o077 != 0):
+                return None
+            with open(FLOW_CACHE_KEY_FILE, "rb") as f:
+                result = f.read()
+        except Exception:
+            return None
+        if len(result) < 32:
+            return None
+        return result
+
+    @classmethod
+    def _cache_key(cls, content):
+        """
+        Generates the key for the cached version of the flow, based on the content of the JSON file
+        and the versions of the library and Python.
+
+        :param content: the content of the JSON file
+        :type content: bytes
+        :return: the key
+        :rtype: tuple
+        """
+        import hashlib
+        try:
+            import importlib.metadata
+            version = importlib.metadata.version("simple-data-flow")
+        except Exception:
+            version = None
+        return hashlib.sha256(content).hexdigest(), version, tuple(sys.version_info[:2])
+
+    @classmethod
+    def _read_cache(cls, cache, secret, key):
+        """
+        Reads the flow from the binary cache. The content only gets unpickled if it was signed with the secret.
+
+        :param cache: the cache file
+        :type cache: str
+        :param secret: the secret for authenticating the cache
+        :type secret: bytes
+        :param key: the expected key of the flow
+        :type key: tuple
+        :return: the flow, None if not available, invalid or outdated
+        :rtype: Flow
+        """
+        import gc
+        import hashlib
+        import hmac
+        import pickle
+        try:
+            with open(cache, "rb") as f:
+                content = f.read()
+        except Exception:
+            return None
+        header = len(FLOW_CACHE_MAGIC)
+        if content[:header] != FLOW_CACHE_MAGIC:
+            return None
+        signature = content[header:header + 32]
+        payload = content[header + 32:]
+        if not hmac.compare_digest(signature, hmac.new(secret, payload, hashlib.sha256).digest()):
+            return None
+        # the garbage collector would repeatedly scan the large number of objects that get created
+        gc_enabled = gc.isenabled()
+        gc.disable()
+        try:
+            cached_key, result = pickle.loads(payload)
+        except Exception:
+            return None
+        finally:
+            if gc_enabled:
+                gc.enable()
+        if cached_key != key:
+            return None
+        return result
+
+    @classmethod
+    def _write_cache(cls, cache, secret, key, flow):
+        """
+        Writes the flow to the binary cache, signed with the secret. Failures get ignored.
+
+        :param cache: the cache file
+        :type cache: str
+        :param secret: the secret for signing the cache
+        :type secret: bytes
+        :param key: the key of the flow
+        :type key: tuple
+        :param flow: the flow to cache
+        :type flow: Flow
+        """
+        import hashlib
+        import hmac
+        import pickle
+        import tempfile
+        tmp = None
+        try:
+            payload = pickle.dumps((key, flow), protocol=pickle.HIGHEST_PROTOCOL)
+            fd, tmp = tempfile.mkstemp(dir=os.path.dirname(os.path.abspath(cache)), suffix=".tmp")
+            with os.fdopen(fd, "wb") as f:
+                f.write(FLOW_CACHE_MAGIC)
+                f.write(hmac.new(secret, payload, hashlib.sha256).digest())
+                f.write(payload)
+            os.replace(tmp, cache)
+        except Exception:
+            # caching is optional, e.g., the directory might not be writable
+            if (tmp is not None) and os.path.exists(tmp):
+                os.remove(tmp)
+
+    @classmethod
+    def load(cls, fname, use_cache=False):
+        """
+        Loads the flow from a JSON file. When using the cache, the loaded flow gets stored in binary form
+        next to the JSON file (extension '.cache'), which gets used instead of parsing the JSON file again
+        as long as the content of the JSON file and the library remain unchanged. The cache is signed with
+        a secret that only the user can read (see FLOW_CACHE_KEY_FILE), caches with an invalid signature
+        get ignored without being unpickled.
 
         :param fname: the file to load
         :type fname: str
+        :param use_cache: whether to use the binary cache
+        :type use_cache: bool
         :return: the flow
         :rtype: Flow
         """
-        with open(fname) as f:
-            content = f.readlines()
-        return Flow.from_json(''.join(content))
+        if not use_cache:
+            with open(fname) as f:
+                return Flow.from_json(f.read())
+
+        with open(fname, "rb") as f:
+            content = f.read()
+        secret = cls._cache_secret()
+        if secret is None:
+            return Flow.from_json(content.decode("utf-8"))
+        key = cls._cache_key(content)
+        cache = fname + ".cache"
+        result = cls._read_cache(cache, secret, key)
+        if result is None:
+            result = Flow.from_json(content.decode("utf-8"))
+            cls._write_cache(cache, secret, key, result)
+        return result
 
     @classmethod
     def save(cls, flow, fname):
@@ -726,7 +1373,6 @@ class Sequence(ActorHandler, InputConsumer):
         :type config: dict
         """
         super(Sequence, self).__init__(name=name, config=config)
-        self._output = []
 
     def description(self):
         """
@@ -769,10 +1415,7 @@ class Sequence(ActorHandler, InputConsumer):
         :rtype: str
         """
         self.first_active.input = self.input
-        result = self._director.execute()
-        if result is None:
-            self._output.append(self.input)
-        return result
+        return self._director.execute()
 
 
 class Tee(ActorHandler, Transformer):
@@ -955,6 +1598,7 @@ class Trigger(ActorHandler, Transformer):
         result = SequentialDirector(self)
         result.record_output = False
         result.allow_source = True
+        result.starts_stream = True
         return result
 
     def check_actors(self, actors):
@@ -990,6 +1634,271 @@ class Trigger(ActorHandler, Transformer):
         return result
 
 
+class Memoize(ActorHandler, Transformer):
+    """
+    Caches the output tokens that the sub-flow generates for the payload of the input token.
+    If the payload was encountered before, the cached output gets forwarded and the sub-flow is skipped.
+    Only use with sub-flows whose output depends solely on the payload. The cache keeps copies of the
+    output payloads and every hit forwards new copies, so downstream actors can modify them.
+    """
+
+    def __init__(self, name=None, config=None):
+        """
+        Initializes the actor.
+
+        :param name: the name of the actor
+        :type name: str
+        :param config: the dictionary with the options (str -> object).
+        :type config: dict
+        """
+        super(Memoize, self).__init__(name=name, config=config)
+        self._cache = OrderedDict()
+        self._cache_size = 0
+        self._hits = 0
+        self._misses = 0
+        self._evictions = 0
+
+    def description(self):
+        """
+        Returns a description of the actor.
+
+        :return: the description
+        :rtype: str
+        """
+        return "Caches the output tokens that the sub-flow generates for the payload of the input token.\n"\
+               "If the payload was encountered before, the cached output gets forwarded and the sub-flow is skipped.\n"\
+               "Only use with sub-flows whose output depends solely on the payload."
+
+    @property
+    def quickinfo(self):
+        """
+        Returns a short string describing some of the options of the actor.
+
+        :return: the info, None if not available
+        :rtype: str
+        """
+        return "entries: " + str(self.config["max_entries"]) \
+               + ", size: " + str(self.config["max_size"]) \
+               + ", ttl: " + str(self.config["ttl"])
+
+    def fix_config(self, options):
+        """
+        Fixes the options, if necessary. I.e., it adds all required elements to the dictionary.
+
+        :param options: the options to fix
+        :type options: dict
+        :return: the (potentially) fixed options
+        :rtype: dict
+        """
+        options = super(Memoize, self).fix_config(options)
+
+        opt = "max_entries"
+        if opt not in options:
+            options[opt] = 1000
+        if opt not in self.help:
+            self.help[opt] = "The maximum number of payloads to cache the output for, evicting the least recently "\
+                             "used ones; 0 for unlimited (int)."
+
+        opt = "max_size"
+        if opt not in options:
+            options[opt] = 0
+        if opt not in self.help:
+            self.help[opt] = "The maximum (approximate) size in bytes of the cached output payloads, evicting the "\
+                             "least recently used ones; 0 for unlimited (int)."
+
+        opt = "ttl"
+        if opt not in options:
+            options[opt] = 0
+        if opt not in self.help:
+            self.help[opt] = "The time in seconds after which cached output expires; 0 for no expiry (float)."
+
+        return options
+
+    def new_director(self):
+        """
+        Creates the director to use for handling the sub-actors.
+
+        :return: the director instance
+        :rtype: Director
+        """
+        result = SequentialDirector(self)
+        result.record_output = True
+        result.allow_source = False
+        return result
+
+    def check_actors(self, actors):
+        """
+        Performs checks on the actors that are to be used. Raises an exception if invalid setup.
+
+        :param actors: the actors to check
+        :type actors: list
+        """
+        super(Memoize, self).check_actors(actors)
+        actor = self.first_active
+        if actor is None:
+            raise Exception("No active actor!")
+        if not isinstance(actor, InputConsumer):
+            raise Exception("First active actor does not accept input: " + actor.full_name)
+        actor = self.last_active
+        if not isinstance(actor, OutputProducer):
+            raise Exception("Last active actor does not generate output: " + actor.full_name)
+
+    @property
+    def hits(self):
+        """
+        Returns the number of cache hits.
+
+        :return: the number of hits
+        :rtype: int
+        """
+        return self._hits
+
+    @property
+    def misses(self):
+        """
+        Returns the number of cache misses.
+
+        :return: the number of misses
+        :rtype: int
+        """
+        return self._misses
+
+    @property
+    def evictions(self):
+        """
+        Returns the number of evicted (or expired) cache entries.
+
+        :return: the number of evictions
+        :rtype: int
+        """
+        return self._evictions
+
+    def clear_cache(self):
+        """
+        Removes all cached output.
+        """
+        self._cache = OrderedDict()
+        self._cache_size = 0
+
+    def setup(self):
+        """
+        Configures the actor before execution.
+
+        :return: None if successful, otherwise error message
+        :rtype: str
+        """
+        result = super(Memoize, self).setup()
+        if result is None:
+            self.clear_cache()
+            self._hits = 0
+            self._misses = 0
+            self._evictions = 0
+        return result
+
+    def _key(self, payload):
+        """
+        Generates the cache key for the payload.
+
+        :param payload: the payload to generate the key for
+        :type payload: object
+        :return: the key, None if the payload cannot be used as key
+        :rtype: object
+        """
+        try:
+            hash(payload)
+            return payload.__class__, payload
+        except TypeError:
+            pass
+        try:
+            import hashlib
+            import pickle
+            return payload.__class__, hashlib.sha1(pickle.dumps(payload, protocol=pickle.HIGHEST_PROTOCOL)).digest()
+        except Exception:
+            return None
+
+    def _evict(self, key):
+        """
+        Removes the entry from the cache.
+
+        :param key: the key of the entry to remove
+        :type key: object
+        """
+        payloads, size, timestamp = self._cache.pop(key)
+        self._cache_size -= size
+        self._evictions += 1
+
+    def _copy(self, payload):
+        """
+        Creates a deep copy of the payload, so that the cached output is not affected by downstream actors.
+
+        :param payload: the payload to copy
+        :type payload: object
+        :return: the copy, the payload itself if it cannot be copied
+        :rtype: object
+        """
+        try:
+            return copy.deepcopy(payload)
+        except Exception:
+            return payload
+
+    def do_execute(self):
+        """
+        The actual execution of the actor.
+
+        :return: None if successful, otherwise error message
+        :rtype: str
+        """
+        key = self._key(self.input.payload)
+        ttl = float(self.resolve_option("ttl"))
+
+        # cached?
+        if (key is not None) and (key in self._cache):
+            payloads, size, timestamp = self._cache[key]
+            if (ttl > 0) and (time.time() - timestamp > ttl):
+                self._evict(key)
+            else:
+                self._cache.move_to_end(key)
+                self._hits += 1
+                for payload in payloads:
+                    self._output.append(Token(self._copy(payload)))
+                return None
+
+        self._misses += 1
+        self._director.clear_recorded_output()
+        self.first_active.input = self.input
+        result = self._director.execute()
+        if result is not None:
+            return result
+        tokens = self._director.recorded_output
+        self._director.clear_recorded_output()
+        self._output.extend(tokens)
+
+        if key is not None:
+            payloads = [self._copy(token.payload) for token in tokens]
+            size = 0
+            for payload in payloads:
+                size += sys.getsizeof(payload)
+            self._cache[key] = (payloads, size, time.time())
+            self._cache_size += size
+            max_entries = int(self.resolve_option("max_entries"))
+            max_size = int(self.resolve_option("max_size"))
+            while (max_entries > 0) and (len(self._cache) > max_entries):
+                self._evict(next(iter(self._cache)))
+            while (max_size > 0) and (self._cache_size > max_size) and (len(self._cache) > 0):
+                self._evict(next(iter(self._cache)))
+
+        return None
+
+    def wrapup(self):
+        """
+        Finishes up after execution finishes, does not remove any graphical output.
+        """
+        self.logger.info("hits=" + str(self._hits) + ", misses=" + str(self._misses)
+                         + ", evictions=" + str(self._evictions))
+        self.clear_cache()
+        super(Memoize, self).wrapup()
+
+
 class BranchDirector(Director, Stoppable):
     """
     Director for the Branch actor.
@@ -1147,6 +2056,9 @@ class ContainerValuePicker(Tee):
         """
         super(ContainerValuePicker, self).__init__(name=name, config=config)
         self._requires_active_actors = False
+        self._fixed_class = None
+        self._fixed_name = None
+        self._fixed_index = -1
 
     def description(self):
         """
@@ -1203,7 +2115,17 @@ class ContainerValuePicker(Tee):
         result = None
         cont = self.input.payload
         name = str(self.resolve_option("value"))
-        value = cont.get(name)
+        if isinstance(cont, FixedContainer):
+            # containers with fixed value names: look up index only once per class
+            if (cont.__class__ is not self._fixed_class) or (name != self._fixed_name):
+                self._fixed_class = cont.__class__
+                self._fixed_name = name
+                self._fixed_index = cont.index(name)
+            if self._fixed_index == -1:
+                return "Unsupported value name for " + cont.__class__.__name__ + ": " + name
+            value = cont.get_at(self._fixed_index)
+        else:
+            value = cont.get(name)
         switch = bool(self.resolve_option("switch"))
         if switch:
             if self.first_active is not None:
@@ -1257,7 +2179,120 @@ class Stop(InputConsumer):
         return None
 
 
-def run_flow(flow, cleanup=False, print_tree=False):
+class CompiledFlow(object):
+    """
+    Handle for a sequence that gets set up only once and then processes payloads repeatedly, without the
+    overhead of setup and wrapup for each of them. The output tokens of the last actor get returned.
+    A sequence without parent gets wrapped in a flow, to provide internal storage.
+    """
+
+    def __init__(self, sequence, flow_config=None):
+        """
+        Initializes the handle and sets up the sequence.
+
+        :param sequence: the sequence to process the payloads with
+        :type sequence: Sequence
+        :param flow_config: the options for the wrapping flow (e.g., storage), only used if the sequence has no parent
+        :type flow_config: dict
+        """
+        if not isinstance(sequence, Sequence):
+            raise Exception("Sequence required, instead received: " + sequence.__class__.__name__)
+        self._sequence = sequence
+        self._flow = None
+        if sequence.parent is None:
+            # only used as parent for providing the storage, not executed itself
+            self._flow = Flow(name="CompiledFlow", config=flow_config)
+            sequence.parent = self._flow
+        self._sequence.director.record_output = True
+        self._sequence.director.starts_stream = True
+        msg = self._sequence.setup()
+        if msg is not None:
+            raise Exception("Failed to set up " + sequence.full_name + ":\n" + msg)
+        self._closed = False
+
+    @property
+    def sequence(self):
+        """
+        Returns the sequence that processes the payloads.
+
+        :return: the sequence
+        :rtype: Sequence
+        """
+        return self._sequence
+
+    @property
+    def storage(self):
+        """
+        Returns the internal storage available to the sequence.
+
+        :return: the storage
+        :rtype: dict
+        """
+        return self._sequence.storagehandler.storage
+
+    def process(self, payload):
+        """
+        Pushes the payload through the sequence and returns the generated output tokens.
+        Raises an exception if the processing failed.
+
+        :param payload: the payload to process, can be a token
+        :type payload: object
+        :return: the tokens output by the last actor
+        :rtype: list
+        """
+        if self._closed:
+            raise Exception("CompiledFlow has already been closed!")
+        if not isinstance(payload, Token):
+            payload = Token(payload)
+        director = self._sequence.director
+        director.clear_recorded_output()
+        self._sequence.input = payload
+        msg = self._sequence.execute()
+        result = director.recorded_output
+        director.clear_recorded_output()
+        if msg is not None:
+            raise Exception("Failed to process payload with " + self._sequence.full_name + ":\n" + msg)
+        return result
+
+    def process_many(self, payloads):
+        """
+        Pushes the payloads through the sequence, one after the other.
+
+        :param payloads: the payloads to process
+        :type payloads: iterable
+        :return: generator for the list of output tokens per payload
+        """
+        for payload in payloads:
+            yield self.process(payload)
+
+    def close(self):
+        """
+        Wraps up the sequence (and the wrapping flow).
+        """
+        if self._closed:
+            return
+        self._closed = True
+        self._sequence.wrapup()
+        if self._flow is not None:
+            self._flow.cleanup()
+
+    def __enter__(self):
+        """
+        Returns the handle itself, for use in a with statement.
+
+        :return: the handle
+        :rtype: CompiledFlow
+        """
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        """
+        Closes the handle at the end of a with statement.
+        """
+        self.close()
+
+
+def run_flow(flow, cleanup=False, print_tree=False, resume=False):
     """
     Executes the flow. Calls setup, execute, wrapup and optionally cleanup.
 
@@ -1267,17 +2302,26 @@ def run_flow(flow, cleanup=False, print_tree=False):
     :type cleanup: bool
     :param print_tree: if the actor is a tree then the actor tree can be output (bool)
     :type print_tree: bool
+    :param resume: whether to resume the flow from its last checkpoint (if any), see 'checkpoint_file' option
+    :type resume: bool
+    :return: None if successful, otherwise error message
+    :rtype: str
     """
 
     msg = flow.setup()
+    if (msg is None) and resume and isinstance(flow, Flow):
+        msg = flow.resume_from_checkpoint()
     if msg is None:
         if print_tree and isinstance(flow, Flow):
             print("\n" + flow.tree + "\n")
         msg = flow.execute()
         if msg is not None:
             print("Error executing flow:\n" + msg)
+        elif isinstance(flow, Flow) and (flow.director.num_errors == 0):
+            flow.clear_checkpoint()
     else:
         print("Error setting up flow:\n" + msg)
     flow.wrapup()
     if cleanup:
         flow.cleanup()
+    return msg
@@ -1,4 +1,12 @@
-from confobj import Configurable
+import copy
+import json
+import os
+import threading
+import simflow.registry as registry
+
+from collections import OrderedDict
+from confobj import Configurable, register_dict_handler
+from simflow.container import AbstractContainer, ContainerBatch
 
 
 class Conversion(Configurable):
@@ -75,6 +83,222 @@ class Conversion(Configurable):
         """
         raise Exception("Not implemented!")
 
+    def convert_batch(self, inputs):
+        """
+        Performs the conversion on a batch of objects, making the list of converted objects available
+        via 'output'. Converts the objects one by one, conversions with bulk backends should override
+        this method.
+
+        :param inputs: the objects to convert
+        :type inputs: list
+        :return: None if successful, otherwise errors message
+        :rtype: str
+        """
+        outputs = []
+        for obj in inputs:
+            self.input = obj
+            result = self.convert()
+            if result is not None:
+                return result
+            outputs.append(self._output)
+        self._input = inputs
+        self._output = outputs
+        return None
+
+
+class ConversionCache(object):
+    """
+    Persistent cache for conversion results, stored as pickle files in a local directory.
+    The keys combine the classname and options of the conversion with the hash of the input
+    (or path, modification time and size for file names). Once the cache exceeds its maximum
+    size, the least recently used results get removed until it is below the low-water mark.
+    The directory only gets scanned initially, afterwards the cache uses an in-memory index.
+    """
+
+    def __init__(self, directory, max_size=0, low_water=0.9):
+        """
+        Initializes the cache.
+
+        :param directory: the directory to store the results in
+        :type directory: str
+        :param max_size: the maximum size in bytes of the cache, 0 for unlimited
+        :type max_size: int
+        :param low_water: the fraction of the maximum size to shrink the cache to when evicting results
+        :type low_water: float
+        """
+        self._directory = directory
+        self._max_size = max_size
+        self._low_water = low_water
+        self._lock = threading.Lock()
+        if not os.path.exists(directory):
+            os.makedirs(directory)
+        self._index = OrderedDict()
+        self._size = 0
+        self._scan()
+
+    @property
+    def directory(self):
+        """
+        Returns the directory of the cache.
+
+        :return: the directory
+        :rtype: str
+        """
+        return self._directory
+
+    @property
+    def size(self):
+        """
+        Returns the (approximate) size in bytes of the cache.
+
+        :return: the size
+        :rtype: int
+        """
+        return self._size
+
+    def _scan(self):
+        """
+        Rebuilds the index (path -> size, least recently used first) from the files in the directory.
+        """
+        entries = []
+        for root, dirs, files in os.walk(self._directory):
+            for f in files:
+                if not f.endswith(".pkl"):
+                    continue
+                path = os.path.join(root, f)
+                try:
+                    st = os.stat(path)
+                    entries.append((path, st.st_mtime, st.st_size))
+                except OSError:
+                    pass
+        entries.sort(key=lambda x: x[1])
+        self._index = OrderedDict((path, size) for path, mtime, size in entries)
+        self._size = sum(self._index.values())
+
+    def _evict(self):
+        """
+        Removes the least recently used results until the cache is below the low-water mark.
+        Must be called with the lock held.
+        """
+        target = self._max_size * self._low_water
+        while (self._size > target) and (len(self._index) > 0):
+            path, size = self._index.popitem(last=False)
+            self._size -= size
+            try:
+                os.remove(path)
+            except OSError:
+                pass
+
+    def _path(self, key):
+        """
+        Returns the file for the key.
+
+        :param key: the key
+        :type key: str
+        :return: the file
+        :rtype: str
+        """
+        return os.path.join(self._directory, key[0:2], key + ".pkl")
+
+    def key(self, conv, obj):
+        """
+        Generates the key for the conversion and the input.
+
+        :param conv: the conversion
+        :type conv: Conversion
+        :param obj: the input for the conversion
+        :type obj: object
+        :return: the key, None if the input cannot be hashed
+        :rtype: str
+        """
+        import hashlib
+        import pickle
+        h = hashlib.sha256()
+        h.update(conv.get_classname(conv).encode("utf-8"))
+        h.update(json.dumps(conv.to_dict()["config"], sort_keys=True, default=str).encode("utf-8"))
+        if isinstance(obj, str) and os.path.isfile(obj):
+            st = os.stat(obj)
+            h.update(("file:" + os.path.abspath(obj) + ":" + str(st.st_mtime_ns) + ":" + str(st.st_size)).encode("utf-8"))
+        elif isinstance(obj, (bytes, bytearray, memoryview)):
+            h.update(b"bytes:")
+            h.update(obj)
+        else:
+            try:
+                h.update(b"pickle:")
+                h.update(pickle.dumps(obj, protocol=pickle.HIGHEST_PROTOCOL))
+            except Exception:
+                return None
+        return h.hexdigest()
+
+    def get(self, key):
+        """
+        Retrieves the result for the key.
+
+        :param key: the key
+        :type key: str
+        :return: tuple of whether the key was found and the result
+        :rtype: tuple
+        """
+        import pickle
+        path = self._path(key)
+        try:
+            with open(path, "rb") as f:
+                result = pickle.load(f)
+        except Exception:
+            return False, None
+        try:
+            os.utime(path)
+        except OSError:
+            pass
+        with self._lock:
+            if path in self._index:
+                self._index.move_to_end(path)
+        return True, result
+
+    def put(self, key, value):
+        """
+        Stores the result under the key.
+
+        :param key: the key
+        :type key: str
+        :param value: the result to store
+        :type value: object
+        :return: None if successful, otherwise error message
+        :rtype: str
+        """
+        import pickle
+        import tempfile
+        path = self._path(key)
+        dirname = os.path.dirname(path)
+        try:
+            if not os.path.exists(dirname):
+                os.makedirs(dirname, exist_ok=True)
+            fd, tmp = tempfile.mkstemp(dir=dirname, suffix=".tmp")
+            with os.fdopen(fd, "wb") as f:
+                pickle.dump(value, f, protocol=pickle.HIGHEST_PROTOCOL)
+            os.replace(tmp, path)
+            size = os.path.getsize(path)
+        except Exception as e:
+            return "Failed to cache result: " + str(e)
+        with self._lock:
+            # overwriting an existing result
+            self._size -= self._index.pop(path, 0)
+            self._index[path] = size
+            self._size += size
+            if (self._max_size > 0) and (self._size > self._max_size):
+                self._evict()
+        return None
+
+    def cleanup(self):
+        """
+        Re-scans the directory (e.g., if other processes share it) and removes the least recently used
+        results if the cache exceeds its maximum size.
+        """
+        with self._lock:
+            self._scan()
+            if (self._max_size > 0) and (self._size > self._max_size):
+                self._evict()
+
 
 class PassThrough(Conversion):
     """
@@ -108,3 +332,291 @@ class PassThrough(Conversion):
         """
         self._output = self._input
         return None
+
+    def convert_batch(self, inputs):
+        """
+        Performs the conversion on a batch of objects, making the list of converted objects available
+        via 'output'.
+
+        :param inputs: the objects to convert
+        :type inputs: list
+        :return: None if successful, otherwise errors message
+        :rtype: str
+        """
+        self._input = inputs
+        self._output = list(inputs)
+        return None
+
+
+class ContainersToBatch(Conversion):
+    """
+    Turns a list of containers into a column-wise container batch.
+    """
+
+    def __init__(self, config=None):
+        """
+        Initializes the conversion.
+
+        :param config: dictionary of options to use
+        :type config: dict
+        """
+        super(ContainersToBatch, self).__init__(config=config)
+
+    def description(self):
+        """
+        Returns the description for the conversion.
+
+        :return: the description
+        :rtype: str
+        """
+        return "Turns a list of containers into a column-wise container batch."
+
+    def fix_config(self, options):
+        """
+        Fixes the options, if necessary. I.e., it adds all required elements to the dictionary.
+
+        :param options: the options to fix
+        :type options: dict
+        :return: the (potentially) fixed options
+        :rtype: dict
+        """
+        options = super(ContainersToBatch, self).fix_config(options)
+
+        opt = "fields"
+        if opt not in options:
+            options[opt] = []
+        if opt not in self.help:
+            self.help[opt] = "The value names to turn into columns; uses all names present if empty (list of string)."
+
+        opt = "use_numpy"
+        if opt not in options:
+            options[opt] = False
+        if opt not in self.help:
+            self.help[opt] = "Whether to generate NumPy arrays instead of lists/arrays as columns (bool)."
+
+        return options
+
+    def check_input(self, obj):
+        """
+        Performs checks on the input object. Raises an exception if unsupported.
+
+        :param obj: the object to check
+        :type obj: object
+        """
+        if not isinstance(obj, (list, tuple)):
+            raise Exception("Expected list of containers, but got: " + str(type(obj)))
+
+    def convert(self):
+        """
+        Performs the actual conversion.
+
+        :return: None if successful, otherwise errors message
+        :rtype: str
+        """
+        for cont in self._input:
+            if not isinstance(cont, AbstractContainer):
+                return "Expected container, but got: " + str(type(cont))
+        fields = self.config["fields"]
+        if (fields is None) or (len(fields) == 0):
+            fields = None
+        self._output = ContainerBatch.from_containers(self._input, fields=fields,
+                                                      use_numpy=bool(self.config["use_numpy"]))
+        return None
+
+
+class BatchToContainers(Conversion):
+    """
+    Turns a column-wise container batch back into a list of containers.
+    """
+
+    def __init__(self, config=None):
+        """
+        Initializes the conversion.
+
+        :param config: dictionary of options to use
+        :type config: dict
+        """
+        super(BatchToContainers, self).__init__(config=config)
+
+    def description(self):
+        """
+        Returns the description for the conversion.
+
+        :return: the description
+        :rtype: str
+        """
+        return "Turns a column-wise container batch back into a list of containers."
+
+    def check_input(self, obj):
+        """
+        Performs checks on the input object. Raises an exception if unsupported.
+
+        :param obj: the object to check
+        :type obj: object
+        """
+        if not isinstance(obj, ContainerBatch):
+            raise Exception("Expected ContainerBatch, but got: " + str(type(obj)))
+
+    def convert(self):
+        """
+        Performs the actual conversion.
+
+        :return: None if successful, otherwise errors message
+        :rtype: str
+        """
+        self._output = self._input.to_containers()
+        return None
+
+
+class ConversionChain(Conversion):
+    """
+    Applies the conversions one after the other, feeding the output of one conversion into the next one.
+    Stops if a conversion does not generate any output. Each execution works on (cheap) copies of the
+    conversion objects, which share the configuration, leaving the configured ones untouched.
+    """
+
+    def __init__(self, config=None):
+        """
+        Initializes the conversion.
+
+        :param config: dictionary of options to use
+        :type config: dict
+        """
+        super(ConversionChain, self).__init__(config=config)
+
+    def description(self):
+        """
+        Returns the description for the conversion.
+
+        :return: the description
+        :rtype: str
+        """
+        return "Applies the conversions one after the other, feeding the output of one conversion into the next one.\n"\
+               "Stops if a conversion does not generate any output."
+
+    def fix_config(self, options):
+        """
+        Fixes the options, if necessary. I.e., it adds all required elements to the dictionary.
+
+        :param options: the options to fix
+        :type options: dict
+        :return: the (potentially) fixed options
+        :rtype: dict
+        """
+        options = super(ConversionChain, self).fix_config(options)
+
+        opt = "conversions"
+        if opt not in options:
+            options[opt] = []
+        if opt not in self.help:
+            self.help[opt] = "The conversions to apply (list of Conversion)."
+
+        return options
+
+    def to_dict(self):
+        """
+        Returns a dictionary that represents this object, to be used for JSONification.
+
+        :return: the object dictionary
+        :rtype: dict
+        """
+        result = super(ConversionChain, self).to_dict()
+        result["type"] = "ConversionChain"
+        result["config"]["conversions"] = []
+        for conv in self.config["conversions"]:
+            result["config"]["conversions"].append(conv.to_dict())
+        return result
+
+    @classmethod
+    def from_dict(cls, d):
+        """
+        Restores an object state from a dictionary, used in de-JSONification.
+
+        :param d: the object dictionary
+        :type d: dict
+        :return: the object
+        :rtype: object
+        """
+        conf = {}
+        for k in d["config"]:
+            v = d["config"][k]
+            if k == "conversions":
+                conf[str(k)] = [registry.get_dict_handler(e["type"])(e) for e in v]
+            elif isinstance(v, dict):
+                conf[str(k)] = registry.get_dict_handler(v["type"])(v)
+            else:
+                conf[str(k)] = v
+        return registry.get_class(str(d["class"]))(config=conf)
+
+    def shallow_copy(self):
+        """
+        Returns a shallow copy of itself, without a JSON round trip. The copy shares the conversion
+        objects, which get copied anyway when executing the chain.
+
+        :return: the copy
+        :rtype: ConversionChain
+        """
+        result = copy.copy(self)
+        result._config = dict(self._config)
+        result._config["conversions"] = list(self._config["conversions"])
+        result._input = None
+        result._output = None
+        return result
+
+    def check_input(self, obj):
+        """
+        Performs checks on the input object. Raises an exception if unsupported.
+
+        :param obj: the object to check
+        :type obj: object
+        """
+        if len(self.config["conversions"]) > 0:
+            self.config["conversions"][0].check_input(obj)
+
+    def convert(self):
+        """
+        Performs the actual conversion.
+
+        :return: None if successful, otherwise errors message
+        :rtype: str
+        """
+        obj = self._input
+        for conv in self.config["conversions"]:
+            conv = copy.copy(conv)
+            conv.input = obj
+            result = conv.convert()
+            if result is not None:
+                return result
+            obj = conv.output
+            if obj is None:
+                break
+        self._output = obj
+        return None
+
+    def convert_batch(self, inputs):
+        """
+        Performs the conversion on a batch of objects, making the list of converted objects available
+        via 'output'. Each conversion gets applied to the whole batch in one go.
+
+        :param inputs: the objects to convert
+        :type inputs: list
+        :return: None if successful, otherwise errors message
+        :rtype: str
+        """
+        objs = list(inputs)
+        for conv in self.config["conversions"]:
+            indices = [i for i, obj in enumerate(objs) if obj is not None]
+            if len(indices) == 0:
+                break
+            conv = copy.copy(conv)
+            result = conv.convert_batch([objs[i] for i in indices])
+            if result is not None:
+                return result
+            for i, obj in zip(indices, conv.output):
+                objs[i] = obj
+        self._input = inputs
+        self._output = objs
+        return None
+
+
+register_dict_handler("ConversionChain", ConversionChain.from_dict)
@@ -0,0 +1,332 @@
+import ast
+import simflow.base as base
+import simflow.control as control
+import simflow.conversion as conversion
+import simflow.transformer as transformer
+
+
+def is_static_active(actor):
+    """
+    Checks whether the actor is active, without the 'skip' option referencing a storage value.
+
+    :param actor: the actor to check
+    :type actor: Actor
+    :return: True if active
+    :rtype: bool
+    """
+    skip = actor.config["skip"]
+    return (skip is None) or (skip is False)
+
+
+def is_static_skipped(actor):
+    """
+    Checks whether the actor is skipped, without the 'skip' option referencing a storage value.
+
+    :param actor: the actor to check
+    :type actor: Actor
+    :return: True if skipped
+    :rtype: bool
+    """
+    return actor.config["skip"] is True
+
+
+def is_sequential(handler):
+    """
+    Checks whether the sub-actors of the actor handler get executed sequentially, i.e.,
+    the output of one actor being the input of the next one.
+
+    :param handler: the actor handler to check
+    :type handler: ActorHandler
+    :return: True if sequential
+    :rtype: bool
+    """
+    return isinstance(handler.director, control.SequentialDirector)
+
+
+def handlers(handler):
+    """
+    Returns the actor handler and all the actor handlers below it. Updates the parents of the
+    sub-actors along the way.
+
+    :param handler: the actor handler to start with
+    :type handler: ActorHandler
+    :return: the list of actor handlers
+    :rtype: list
+    """
+    handler.update_parent()
+    result = [handler]
+    for actor in handler.actors:
+        if isinstance(actor, control.ActorHandler):
+            result.extend(handlers(actor))
+    return result
+
+
+def _is_fusable_convert(actor):
+    """
+    Checks whether the actor is a Convert actor that can be fused with other ones.
+
+    :param actor: the actor to check
+    :type actor: Actor
+    :return: True if fusable
+    :rtype: bool
+    """
+    return (actor.__class__ is transformer.Convert) \
+        and is_static_active(actor) \
+        and (len(str(actor.config["cache_dir"])) == 0) \
+        and isinstance(actor.config["setup"], conversion.Conversion)
+
+
+def fuse_converts(handler):
+    """
+    Replaces adjacent Convert actors in sequentially executed actor handlers with a single Convert
+    actor that uses a ConversionChain, which avoids the overhead of generating intermediate tokens.
+    Convert actors that use caching are left untouched.
+
+    :param handler: the actor handler to process (recursively)
+    :type handler: ActorHandler
+    :return: the list of rewrites that were performed
+    :rtype: list
+    """
+    result = []
+    for h in handlers(handler):
+        if not is_sequential(h):
+            continue
+        actors = []
+        group = []
+        for actor in h.actors + [None]:
+            if (actor is not None) and _is_fusable_convert(actor) \
+                    and ((len(group) == 0) or (actor.config["batch"] == group[0].config["batch"])):
+                group.append(actor)
+                continue
+            if len(group) > 1:
+                conversions = []
+                for conv in group:
+                    setup = conv.config["setup"]
+                    if isinstance(setup, conversion.ConversionChain):
+                        conversions.extend(setup.config["conversions"])
+                    else:
+                        conversions.append(setup)
+                fused = transformer.Convert(name=group[0].name, config={
+                    "setup": conversion.ConversionChain(config={"conversions": conversions}),
+                    "batch": group[0].config["batch"],
+                    "annotation": group[0].config["annotation"],
+                })
+                actors.append(fused)
+                result.append("Fused " + str(len(group)) + " Convert actors in '" + h.full_name + "' "
+                              + "starting at index " + str(len(actors) - 1))
+            else:
+                actors.extend(group)
+            group = []
+            if actor is not None:
+                if _is_fusable_convert(actor):
+                    group.append(actor)
+                else:
+                    actors.append(actor)
+        h.actors = actors
+    return result
+
+
+def remove_skipped(handler):
+    """
+    Removes all skipped actors.
+
+    :param handler: the actor handler to process (recursively)
+    :type handler: ActorHandler
+    :return: the list of rewrites that were performed
+    :rtype: list
+    """
+    result = []
+    for h in handlers(handler):
+        actors = []
+        for actor in h.actors:
+            if is_static_skipped(actor):
+                result.append("Removed skipped actor '" + actor.full_name + "'")
+            else:
+                actors.append(actor)
+        if len(actors) != len(h.actors):
+            h.actors = actors
+    return result
+
+
+def remove_passthroughs(handler):
+    """
+    Removes PassThrough actors from sequentially executed actor handlers, as long as the handler
+    has other actors left.
+
+    :param handler: the actor handler to process (recursively)
+    :type handler: ActorHandler
+    :return: the list of rewrites that were performed
+    :rtype: list
+    """
+    result = []
+    for h in handlers(handler):
+        if not is_sequential(h):
+            continue
+        actors = []
+        for actor in h.actors:
+            if (actor.__class__ is transformer.PassThrough) and is_static_active(actor) and (len(h.actors) > 1):
+                result.append("Removed PassThrough actor '" + actor.full_name + "'")
+            else:
+                actors.append(actor)
+        if len(actors) == 0:
+            actors = h.actors[:1]
+            result.pop()
+        if len(actors) != len(h.actors):
+            h.actors = actors
+    return result
+
+
+def flatten_sequences(handler):
+    """
+    Replaces Sequence actors that only have a single sub-actor, which does not generate any output,
+    with that sub-actor.
+
+    :param handler: the actor handler to process (recursively)
+    :type handler: ActorHandler
+    :return: the list of rewrites that were performed
+    :rtype: list
+    """
+    result = []
+    for h in handlers(handler):
+        changed = False
+        actors = []
+        for actor in h.actors:
+            if (actor.__class__ is control.Sequence) \
+                    and is_static_active(actor) \
+                    and (len(actor.actors) == 1) \
+                    and is_static_active(actor.actors[0]) \
+                    and not isinstance(actor.actors[0], base.OutputProducer):
+                result.append("Flattened Sequence actor '" + actor.full_name + "'")
+                actors.append(actor.actors[0])
+                changed = True
+            else:
+                actors.append(actor)
+        if changed:
+            h.actors = actors
+    return result
+
+
+def _is_fusable_expression(actor):
+    """
+    Checks whether the actor is a MathExpression actor that can be fused with other ones.
+
+    :param actor: the actor to check
+    :type actor: Actor
+    :return: True if fusable
+    :rtype: bool
+    """
+    if (actor.__class__ is not transformer.MathExpression) or not is_static_active(actor):
+        return False
+    expr = actor.config["expression"]
+    # storage references get resolved at execution time
+    return isinstance(expr, str) and not expr.startswith("@{") \
+        and isinstance(actor.config["chained_expressions"], list)
+
+
+def fuse_math_expressions(handler):
+    """
+    Replaces adjacent MathExpression actors in sequentially executed actor handlers with a single
+    MathExpression actor, which evaluates the expressions of the others as chained expressions on its result.
+    The chained expressions still get evaluated one after the other (i.e., with the string representation of
+    the intermediate result, unless it is a non-negative number used as operand), saving the passing of tokens.
+
+    :param handler: the actor handler to process (recursively)
+    :type handler: ActorHandler
+    :return: the list of rewrites that were performed
+    :rtype: list
+    """
+    result = []
+    for h in handlers(handler):
+        if not is_sequential(h):
+            continue
+        changed = False
+        actors = []
+        for actor in h.actors:
+            if (len(actors) > 0) and _is_fusable_expression(actors[-1]) and _is_fusable_expression(actor):
+                prev = actors[-1]
+                chained = prev.config["chained_expressions"] + [actor.config["expression"]] \
+                    + actor.config["chained_expressions"]
+                actors[-1] = transformer.MathExpression(name=prev.name, config={
+                    "expression": prev.config["expression"],
+                    "chained_expressions": chained,
+                    "annotation": prev.config["annotation"],
+                })
+                result.append("Fused MathExpression actors '" + prev.full_name + "' and '" + actor.full_name + "'")
+                changed = True
+            else:
+                actors.append(actor)
+        if changed:
+            h.actors = actors
+    return result
+
+
+def _is_immutable(value):
+    """
+    Checks whether the value is immutable, i.e., can be shared safely.
+
+    :param value: the value to check
+    :type value: object
+    :return: True if immutable
+    :rtype: bool
+    """
+    if (value is None) or isinstance(value, (bool, int, float, complex, str, bytes)):
+        return True
+    if isinstance(value, (tuple, frozenset)):
+        for v in value:
+            if not _is_immutable(v):
+                return False
+        return True
+    return False
+
+
+def fold_constants(handler):
+    """
+    Evaluates the values of InitStorageValue actors only once if they are constant literals
+    with immutable values.
+
+    :param handler: the actor handler to process (recursively)
+    :type handler: ActorHandler
+    :return: the list of rewrites that were performed
+    :rtype: list
+    """
+    result = []
+    for h in handlers(handler):
+        for actor in h.actors:
+            if not isinstance(actor, transformer.InitStorageValue) or actor.has_constant:
+                continue
+            value = actor.config["value"]
+            if not isinstance(value, str) or value.startswith("@{"):
+                continue
+            try:
+                value = ast.literal_eval(value.strip())
+            except Exception:
+                continue
+            if _is_immutable(value):
+                actor.set_constant(value)
+                result.append("Folded constant value of '" + actor.full_name + "'")
+    return result
+
+
+def optimize(handler):
+    """
+    Rewrites the actor tree in place for faster execution.
+    Applies the optimizations until the tree no longer changes.
+
+    :param handler: the actor handler to optimize (recursively)
+    :type handler: ActorHandler
+    :return: the list of rewrites that were performed
+    :rtype: list
+    """
+    result = []
+    while True:
+        rewrites = []
+        rewrites.extend(remove_skipped(handler))
+        rewrites.extend(remove_passthroughs(handler))
+        rewrites.extend(flatten_sequences(handler))
+        rewrites.extend(fuse_converts(handler))
+        rewrites.extend(fuse_math_expressions(handler))
+        rewrites.extend(fold_constants(handler))
+        if len(rewrites) == 0:
+            break
+        result.extend(rewrites)
+    return result
@@ -0,0 +1,162 @@
+import importlib
+
+from confobj import get_dict_handler as _get_dict_handler, has_dict_handler
+
+ENTRY_POINT_GROUP = "simflow.actors"
+""" the entry point group that third-party packages use for making their actors available """
+
+_modules = {
+    "ActorHandler": "simflow.control",
+    "Branch": "simflow.control",
+    "ContainerValuePicker": "simflow.control",
+    "Flow": "simflow.control",
+    "Memoize": "simflow.control",
+    "Sequence": "simflow.control",
+    "Stop": "simflow.control",
+    "Tee": "simflow.control",
+    "Trigger": "simflow.control",
+    "CombineStorage": "simflow.source",
+    "FileSupplier": "simflow.source",
+    "ForLoop": "simflow.source",
+    "GetStorageValue": "simflow.source",
+    "ListFiles": "simflow.source",
+    "ReadRecords": "simflow.source",
+    "Start": "simflow.source",
+    "StringConstants": "simflow.source",
+    "Convert": "simflow.transformer",
+    "DeleteFile": "simflow.transformer",
+    "DeleteStorageValue": "simflow.transformer",
+    "InitStorageValue": "simflow.transformer",
+    "Limit": "simflow.transformer",
+    "MathExpression": "simflow.transformer",
+    "MemoryMapFile": "simflow.transformer",
+    "PassThrough": "simflow.transformer",
+    "SetStorageValue": "simflow.transformer",
+    "UpdateStorageValue": "simflow.transformer",
+    "Console": "simflow.sink",
+    "DumpFile": "simflow.sink",
+    "Null": "simflow.sink",
+}
+""" the modules of the actors, by class name """
+
+_handler_modules = {
+    "Actor": "simflow.base",
+    "Configurable": "simflow.base",
+    "ActorHandler": "simflow.control",
+    "ConversionChain": "simflow.conversion",
+}
+""" the modules that register the dict handlers, by type """
+
+_classes = {}
+""" the classes that have been resolved so far, by name """
+
+_discovered = False
+""" whether the entry points have been processed already """
+
+
+def register_class(name, module):
+    """
+    Registers the module that contains the class with the given name. The module only gets imported
+    when the class gets requested.
+
+    :param name: the name of the class
+    :type name: str
+    :param module: the module containing the class
+    :type module: str
+    """
+    _modules[name] = module
+    _classes.pop(name, None)
+
+
+def discover():
+    """
+    Registers the actors that third-party packages make available via the 'simflow.actors' entry point
+    group, e.g.: "MyActor = mypackage.actors:MyActor". Only done once.
+    """
+    global _discovered
+    if _discovered:
+        return
+    _discovered = True
+    import importlib.metadata
+    eps = importlib.metadata.entry_points()
+    if hasattr(eps, "select"):
+        eps = eps.select(group=ENTRY_POINT_GROUP)
+    else:
+        eps = eps.get(ENTRY_POINT_GROUP, [])
+    for ep in eps:
+        module, _, attr = ep.value.partition(":")
+        if len(attr) == 0:
+            module, _, attr = ep.value.rpartition(".")
+        register_class(attr.strip(), module.strip())
+        if ep.name != attr.strip():
+            _modules[ep.name] = module.strip() + ":" + attr.strip()
+
+
+def _resolve(module, name):
+    """
+    Imports the module and returns the class.
+
+    :param module: the module to import
+    :type module: str
+    :param name: the name of the class
+    :type name: str
+    :return: the class
+    """
+    if ":" in module:
+        module, name = module.split(":", 1)
+    return getattr(importlib.import_module(module), name)
+
+
+def get_class(classname):
+    """
+    Returns the class for the name, which can either be the dot-notation classname
+    (e.g., 'simflow.source.ForLoop') or the name of a registered class (e.g., 'ForLoop').
+    Modules only get imported when needed and classes are cached.
+
+    :param classname: the name of the class
+    :type classname: str
+    :return: the class
+    """
+    result = _classes.get(classname)
+    if result is not None:
+        return result
+    if "." in classname:
+        module, _, name = classname.rpartition(".")
+        result = _resolve(module, name)
+    else:
+        if classname not in _modules:
+            discover()
+        if classname not in _modules:
+            raise Exception("Unknown class: " + classname)
+        result = _resolve(_modules[classname], classname)
+    _classes[classname] = result
+    return result
+
+
+def class_names():
+    """
+    Returns the names of all the registered classes, including the ones from entry points.
+
+    :return: the sorted names
+    :rtype: list
+    """
+    discover()
+    return sorted(_modules.keys())
+
+
+def get_dict_handler(typestr):
+    """
+    Returns the handler for restoring an object from a JSON dictionary. If no handler has been
+    registered yet, the module that registers it gets imported first.
+
+    :param typestr: the type of the object
+    :type typestr: str
+    :return: the handler
+    """
+    typestr = str(typestr)
+    if not has_dict_handler(typestr):
+        if typestr in _handler_modules:
+            importlib.import_module(_handler_modules[typestr])
+        else:
+            raise Exception("No dict handler registered for type: " + typestr)
+    return _get_dict_handler(typestr)
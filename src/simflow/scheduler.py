@@ -0,0 +1,577 @@
+import datetime
+import heapq
+import itertools
+import logging
+import threading
+import time
+import traceback
+
+from concurrent.futures import ThreadPoolExecutor
+
+logger = logging.getLogger(__name__)
+""" the logger for the scheduler """
+
+
+class Schedule(object):
+    """
+    Ancestor for schedules, which determine when a flow gets executed.
+    """
+
+    def next_time(self, after):
+        """
+        Returns the next time (seconds since the epoch) after the specified time.
+
+        :param after: the time to start from (seconds since the epoch)
+        :type after: float
+        :return: the next time
+        :rtype: float
+        """
+        raise Exception("Not implemented!")
+
+
+class IntervalSchedule(Schedule):
+    """
+    Executes the flow at fixed intervals.
+    """
+
+    def __init__(self, seconds):
+        """
+        Initializes the schedule.
+
+        :param seconds: the interval in seconds
+        :type seconds: float
+        """
+        if seconds <= 0:
+            raise Exception("Interval must be greater than 0: " + str(seconds))
+        self.seconds = seconds
+
+    def next_time(self, after):
+        """
+        Returns the next time (seconds since the epoch) after the specified time.
+
+        :param after: the time to start from (seconds since the epoch)
+        :type after: float
+        :return: the next time
+        :rtype: float
+        """
+        return after + self.seconds
+
+    def __str__(self):
+        """
+        Returns a short description of the schedule.
+
+        :return: the description
+        :rtype: str
+        """
+        return "every " + str(self.seconds) + "s"
+
+
+class CronSchedule(Schedule):
+    """
+    Executes the flow based on a cron expression (local time) with the five fields minute, hour,
+    day of month, month and day of week (0-7, 0 and 7 being Sunday). Fields support '*', lists ('1,5'),
+    ranges ('1-5') and steps ('*/15', '1-30/5'). Like cron, a day matches if either day of month or
+    day of week match, in case both are restricted.
+    """
+
+    def __init__(self, expression):
+        """
+        Initializes the schedule.
+
+        :param expression: the cron expression, e.g., '*/5 * * * *'
+        :type expression: str
+        """
+        fields = expression.split()
+        if len(fields) != 5:
+            raise Exception("Cron expression requires 5 fields: " + expression)
+        self.expression = expression
+        self._minutes = self._parse(fields[0], 0, 59)
+        self._hours = self._parse(fields[1], 0, 23)
+        self._days = self._parse(fields[2], 1, 31)
+        self._months = self._parse(fields[3], 1, 12)
+        self._weekdays = set([d % 7 for d in self._parse(fields[4], 0, 7)])
+        self._any_day = fields[2] == "*"
+        self._any_weekday = fields[4] == "*"
+
+    def _parse(self, field, lower, upper):
+        """
+        Parses a single field of the expression.
+
+        :param field: the field to parse
+        :type field: str
+        :param lower: the smallest allowed value
+        :type lower: int
+        :param upper: the largest allowed value
+        :type upper: int
+        :return: the values
+        :rtype: set
+        """
+        result = set()
+        for part in field.split(","):
+            step = 1
+            if "/" in part:
+                part, step = part.split("/", 1)
+                step = int(step)
+            if part == "*":
+                start, end = lower, upper
+            elif "-" in part:
+                start, end = [int(x) for x in part.split("-", 1)]
+            else:
+                start = int(part)
+                end = upper if step > 1 else start
+            if (start < lower) or (end > upper) or (start > end) or (step < 1):
+                raise Exception("Invalid cron field: " + field)
+            result.update(range(start, end + 1, step))
+        return result
+
+    def _matches_day(self, t):
+        """
+        Checks whether the day of the timestamp matches.
+
+        :param t: the time to check
+        :type t: datetime.datetime
+        :return: True if a match
+        :rtype: bool
+        """
+        day = t.day in self._days
+        weekday = ((t.weekday() + 1) % 7) in self._weekdays
+        if self._any_day and self._any_weekday:
+            return True
+        if self._any_day:
+            return weekday
+        if self._any_weekday:
+            return day
+        return day or weekday
+
+    def next_time(self, after):
+        """
+        Returns the next time (seconds since the epoch) after the specified time.
+
+        :param after: the time to start from (seconds since the epoch)
+        :type after: float
+        :return: the next time
+        :rtype: float
+        """
+        t = datetime.datetime.fromtimestamp(after).replace(second=0, microsecond=0) + datetime.timedelta(minutes=1)
+        max_year = t.year + 5
+        while t.year <= max_year:
+            if t.month not in self._months:
+                if t.month == 12:
+                    t = t.replace(year=t.year + 1, month=1, day=1, hour=0, minute=0)
+                else:
+                    t = t.replace(month=t.month + 1, day=1, hour=0, minute=0)
+            elif not self._matches_day(t):
+                t = t.replace(hour=0, minute=0) + datetime.timedelta(days=1)
+            elif t.hour not in self._hours:
+                t = t.replace(minute=0) + datetime.timedelta(hours=1)
+            elif t.minute not in self._minutes:
+                t = t + datetime.timedelta(minutes=1)
+            else:
+                return t.timestamp()
+        raise Exception("No matching time found for: " + self.expression)
+
+    def __str__(self):
+        """
+        Returns a short description of the schedule.
+
+        :return: the description
+        :rtype: str
+        """
+        return "cron '" + self.expression + "'"
+
+
+class FlowStats(object):
+    """
+    Run-time statistics of a scheduled flow.
+    """
+
+    def __init__(self):
+        """
+        Initializes the statistics.
+        """
+        self.runs = 0
+        self.failures = 0
+        self.skipped = 0
+        self.total_time = 0.0
+        self.min_time = None
+        self.max_time = None
+        self.last_start = None
+        self.last_time = None
+        self.last_error = None
+
+    def add(self, start, duration, error):
+        """
+        Records a run.
+
+        :param start: the start of the run (seconds since the epoch)
+        :type start: float
+        :param duration: the duration in seconds
+        :type duration: float
+        :param error: the error message, None if successful
+        :type error: str
+        """
+        self.runs += 1
+        if error is not None:
+            self.failures += 1
+            self.last_error = error
+        self.total_time += duration
+        if (self.min_time is None) or (duration < self.min_time):
+            self.min_time = duration
+        if (self.max_time is None) or (duration > self.max_time):
+            self.max_time = duration
+        self.last_start = start
+        self.last_time = duration
+
+    @property
+    def mean_time(self):
+        """
+        Returns the average run time.
+
+        :return: the average in seconds, None if no runs yet
+        :rtype: float
+        """
+        if self.runs == 0:
+            return None
+        return self.total_time / self.runs
+
+    def to_dict(self):
+        """
+        Returns the statistics as dictionary.
+
+        :return: the statistics
+        :rtype: dict
+        """
+        return {
+            "runs": self.runs,
+            "failures": self.failures,
+            "skipped": self.skipped,
+            "total_time": self.total_time,
+            "mean_time": self.mean_time,
+            "min_time": self.min_time,
+            "max_time": self.max_time,
+            "last_start": self.last_start,
+            "last_time": self.last_time,
+            "last_error": self.last_error,
+        }
+
+
+class ScheduledFlow(object):
+    """
+    A flow managed by the scheduler, with a pool of flow instances for concurrent runs.
+    """
+
+    def __init__(self, name, flow, schedule, max_concurrent=1, skip_if_running=True):
+        """
+        Initializes the scheduled flow.
+
+        :param name: the name of the scheduled flow
+        :type name: str
+        :param flow: the flow or the JSON file to load it from
+        :type flow: Flow or str
+        :param schedule: the schedule
+        :type schedule: Schedule
+        :param max_concurrent: the maximum number of concurrent runs
+        :type max_concurrent: int
+        :param skip_if_running: whether to skip a run if the maximum number of runs is active, otherwise
+                                the run gets started once a run finishes (at most one run gets queued)
+        :type skip_if_running: bool
+        """
+        from simflow.control import Flow
+        if max_concurrent < 1:
+            raise Exception("At least one concurrent run required: " + str(max_concurrent))
+        self.name = name
+        if isinstance(flow, Flow):
+            self._fname = None
+            self._template = flow
+        else:
+            self._fname = flow
+            self._template = Flow.load(flow)
+        self.schedule = schedule
+        self.max_concurrent = max_concurrent
+        self.skip_if_running = skip_if_running
+        self.stats = FlowStats()
+        self.running = 0
+        self.queued = False
+        self.retired = False
+        self._idle = [self._template]
+        self._instances = [self._template]
+
+    def acquire(self):
+        """
+        Returns an idle flow instance, creates a new one if necessary. Must be called with the
+        scheduler's lock held.
+
+        :return: the flow
+        :rtype: Flow
+        """
+        if len(self._idle) > 0:
+            return self._idle.pop()
+        if self._fname is not None:
+            from simflow.control import Flow
+            result = Flow.load(self._fname)
+        else:
+            result = self._template.shallow_copy()
+        self._instances.append(result)
+        return result
+
+    def release(self, flow):
+        """
+        Returns the flow instance to the pool. Must be called with the scheduler's lock held.
+
+        :param flow: the flow to return
+        :type flow: Flow
+        """
+        self._idle.append(flow)
+
+    def retire(self):
+        """
+        Marks the scheduled flow as no longer in use. Must be called with the scheduler's lock held.
+
+        :return: whether the flow instances can be cleaned up now, i.e., no runs are active
+        :rtype: bool
+        """
+        self.retired = True
+        self.queued = False
+        return self.running == 0
+
+    def cleanup(self):
+        """
+        Cleans up all flow instances.
+        """
+        for flow in self._instances:
+            flow.cleanup()
+
+
+class Scheduler(object):
+    """
+    Executes many flows in a single process according to their schedules, using a shared pool of worker threads.
+    """
+
+    def __init__(self, max_workers=4):
+        """
+        Initializes the scheduler.
+
+        :param max_workers: the number of worker threads for executing the flows
+        :type max_workers: int
+        """
+        self._max_workers = max_workers
+        self._flows = dict()
+        self._queue = []
+        self._counter = itertools.count()
+        self._cond = threading.Condition()
+        self._executor = None
+        self._thread = None
+        self._stopping = False
+
+    def add(self, name, flow, schedule, max_concurrent=1, skip_if_running=True):
+        """
+        Adds the flow to the scheduler.
+
+        :param name: the unique name of the scheduled flow
+        :type name: str
+        :param flow: the flow or the JSON file to load it from
+        :type flow: Flow or str
+        :param schedule: the schedule, the interval in seconds or a cron expression
+        :type schedule: Schedule or float or str
+        :param max_concurrent: the maximum number of concurrent runs of the flow
+        :type max_concurrent: int
+        :param skip_if_running: whether to skip a run if the maximum number of runs is active, otherwise
+                                the run gets started once a run finishes (at most one run gets queued)
+        :type skip_if_running: bool
+        :return: the scheduled flow
+        :rtype: ScheduledFlow
+        """
+        if isinstance(schedule, str):
+            schedule = CronSchedule(schedule)
+        elif isinstance(schedule, (int, float)):
+            schedule = IntervalSchedule(schedule)
+        entry = ScheduledFlow(name, flow, schedule, max_concurrent=max_concurrent, skip_if_running=skip_if_running)
+        with self._cond:
+            if name in self._flows:
+                raise Exception("Flow already scheduled: " + name)
+            self._flows[name] = entry
+            heapq.heappush(self._queue, (schedule.next_time(time.time()), next(self._counter), entry))
+            self._cond.notify()
+        return entry
+
+    def remove(self, name):
+        """
+        Removes the flow from the scheduler. Active runs get finished, the flow instances get cleaned up
+        afterwards.
+
+        :param name: the name of the scheduled flow
+        :type name: str
+        """
+        with self._cond:
+            entry = self._flows.pop(name)
+            self._queue = [item for item in self._queue if item[2] is not entry]
+            heapq.heapify(self._queue)
+            self._cond.notify()
+            idle = entry.retire()
+        if idle:
+            entry.cleanup()
+
+    @property
+    def names(self):
+        """
+        Returns the names of the scheduled flows.
+
+        :return: the names
+        :rtype: list
+        """
+        with self._cond:
+            return sorted(self._flows.keys())
+
+    def stats(self, name=None):
+        """
+        Returns the run-time statistics.
+
+        :param name: the name of the scheduled flow, None for all
+        :type name: str
+        :return: the statistics of the flow or, if no name provided, a dictionary with the statistics per flow
+        :rtype: dict
+        """
+        with self._cond:
+            if name is not None:
+                return self._flows[name].stats.to_dict()
+            return {n: self._flows[n].stats.to_dict() for n in self._flows}
+
+    def start(self):
+        """
+        Starts the scheduler in a background thread.
+        """
+        with self._cond:
+            if self._thread is not None:
+                return
+            self._stopping = False
+            for entry in self._flows.values():
+                entry.retired = False
+            self._executor = ThreadPoolExecutor(max_workers=self._max_workers, thread_name_prefix="simflow")
+            self._thread = threading.Thread(target=self._loop, name="simflow-scheduler", daemon=True)
+            self._thread.start()
+
+    def stop(self, wait=True):
+        """
+        Stops the scheduler and cleans up the flows. When not waiting, the flows with active runs get
+        cleaned up once these runs finish.
+
+        :param wait: whether to wait for active runs to finish
+        :type wait: bool
+        """
+        with self._cond:
+            if self._thread is None:
+                return
+            self._stopping = True
+            self._cond.notify()
+        self._thread.join()
+        self._thread = None
+        self._executor.shutdown(wait=wait)
+        with self._cond:
+            self._executor = None
+            idle = [entry for entry in self._flows.values() if entry.retire()]
+        for entry in idle:
+            entry.cleanup()
+
+    def run_now(self, name):
+        """
+        Triggers a run of the flow outside its schedule (subject to its concurrency limit).
+
+        :param name: the name of the scheduled flow
+        :type name: str
+        """
+        with self._cond:
+            if self._executor is None:
+                raise Exception("Scheduler not running!")
+            self._trigger(self._flows[name])
+
+    def _loop(self):
+        """
+        Starts the flows when they are due.
+        """
+        with self._cond:
+            while not self._stopping:
+                if len(self._queue) == 0:
+                    self._cond.wait()
+                    continue
+                due, _, entry = self._queue[0]
+                now = time.time()
+                if due > now:
+                    self._cond.wait(due - now)
+                    continue
+                heapq.heappop(self._queue)
+                self._trigger(entry)
+                # missed runs don't get caught up on
+                next_due = entry.schedule.next_time(due)
+                if next_due <= now:
+                    next_due = entry.schedule.next_time(now)
+                heapq.heappush(self._queue, (next_due, next(self._counter), entry))
+
+    def _trigger(self, entry):
+        """
+        Starts a run of the flow, unless the concurrency limit is reached. Must be called with the lock held.
+
+        :param entry: the scheduled flow
+        :type entry: ScheduledFlow
+        """
+        if entry.running >= entry.max_concurrent:
+            if entry.skip_if_running:
+                entry.stats.skipped += 1
+                logger.info("Skipping run of '" + entry.name + "', still running")
+            else:
+                entry.queued = True
+            return
+        entry.running += 1
+        flow = entry.acquire()
+        self._executor.submit(self._run, entry, flow)
+
+    def _run(self, entry, flow):
+        """
+        Executes the flow and records the statistics.
+
+        :param entry: the scheduled flow
+        :type entry: ScheduledFlow
+        :param flow: the flow instance to execute
+        :type flow: Flow
+        """
+        start = time.time()
+        try:
+            try:
+                msg = flow.setup()
+                if msg is None:
+                    msg = flow.execute()
+                    if (msg is None) and (flow.director.num_errors > 0):
+                        msg = str(flow.director.num_errors) + " actor(s) generated errors"
+            finally:
+                # the flow instance gets reused, it must not keep any state of this run
+                flow.wrapup()
+        except Exception:
+            msg = traceback.format_exc()
+        duration = time.time() - start
+        if msg is not None:
+            logger.error("Run of '" + entry.name + "' failed:\n" + msg)
+        with self._cond:
+            entry.stats.add(start, duration, msg)
+            entry.release(flow)
+            entry.running -= 1
+            retired = entry.retired and (entry.running == 0)
+            if entry.queued and not self._stopping and (self._executor is not None):
+                entry.queued = False
+                self._trigger(entry)
+        if retired:
+            entry.cleanup()
+
+    def __enter__(self):
+        """
+        Starts the scheduler, for use in a with statement.
+
+        :return: the scheduler
+        :rtype: Scheduler
+        """
+        self.start()
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        """
+        Stops the scheduler at the end of a with statement.
+        """
+        self.stop()
@@ -1,7 +1,12 @@
+import csv
+import io
+import json
 import os
 import re
+import traceback
 
 from simflow.base import Actor, OutputProducer, Token
+from simflow.container import Container, container_class, unique_names
 
 
 class Source(OutputProducer, Actor):
@@ -20,6 +25,68 @@ class Source(OutputProducer, Actor):
         """
         super(Source, self).__init__(name=name, config=config)
         super(OutputProducer, self).__init__(name=name, config=config)
+        self._position = 0
+        self._resume_position = None
+
+    @property
+    def position(self):
+        """
+        Returns the position of the source, i.e., the number of tokens that were output.
+        Can be used for resuming the source with resume_from.
+
+        :return: the position
+        :rtype: int
+        """
+        return self._position
+
+    def resume_from(self, position):
+        """
+        Makes the source skip everything up to the specified position during the next execution.
+
+        :param position: the position (as obtained from the position property)
+        :type position: int
+        """
+        self._resume_position = position
+
+    def pre_execute(self):
+        """
+        Gets executed before the actual execution.
+
+        :return: None if successful, otherwise error message
+        :rtype: str
+        """
+        result = super(Source, self).pre_execute()
+        if result is None:
+            self._position = 0
+        return result
+
+    def post_execute(self):
+        """
+        Gets executed after the actual execution. Skips the tokens up to the resume position, if any.
+
+        :return: None if successful, otherwise error message
+        :rtype: str
+        """
+        result = super(Source, self).post_execute()
+        if (result is None) and (self._resume_position is not None):
+            skip = min(int(self._resume_position), len(self._output))
+            for i in range(skip):
+                self._output.pop(0)
+            self._position = skip
+            self._resume_position = None
+        return result
+
+    def output(self):
+        """
+        Returns the next available output token.
+
+        :return: the next token, None if none available
+        :rtype: Token
+        """
+        result = super(Source, self).output()
+        if result is not None:
+            self._position += 1
+        return result
 
 
 class Start(Source):
@@ -126,7 +193,9 @@ class FileSupplier(Source):
 
 class ListFiles(Source):
     """
-    Source that list files in a directory.
+    Source that list files in a directory. The files/dirs get output sorted by their path.
+    When resuming, everything up to and including the last path that was output gets skipped,
+    i.e., files that got added since and sort before that path do not get output.
     """
 
     def __init__(self, name=None, config=None):
@@ -139,6 +208,7 @@ class ListFiles(Source):
         :type config: dict
         """
         super(ListFiles, self).__init__(name=name, config=config)
+        self._last = None
 
     def description(self):
         """
@@ -147,7 +217,9 @@ class ListFiles(Source):
         :return: the description
         :rtype: str
         """
-        return "Source that list files in a directory."
+        return "Source that list files in a directory. The files/dirs get output sorted by their path.\n"\
+               "When resuming, everything up to and including the last path that was output gets skipped,\n"\
+               "i.e., files that got added since and sort before that path do not get output."
 
     @property
     def quickinfo(self):
@@ -205,6 +277,28 @@ class ListFiles(Source):
 
         return options
 
+    @property
+    def position(self):
+        """
+        Returns the last file/dir that was output, can be used for resuming with resume_from.
+
+        :return: the path, None if nothing output yet
+        :rtype: str
+        """
+        return self._last
+
+    def pre_execute(self):
+        """
+        Gets executed before the actual execution.
+
+        :return: None if successful, otherwise error message
+        :rtype: str
+        """
+        result = super(ListFiles, self).pre_execute()
+        if result is None:
+            self._last = None
+        return result
+
     def _list(self, path, collected):
         """
         Lists all the files/dirs in directory that match the pattern.
@@ -254,10 +348,27 @@ class ListFiles(Source):
         collected = []
         result = self._list(directory, collected)
         if result is None:
+            collected.sort()
+            if self._resume_position is not None:
+                self._last = str(self._resume_position)
+                self._resume_position = None
+                collected = [c for c in collected if c > self._last]
             for c in collected:
                 self._output.append(Token(c))
         return result
 
+    def output(self):
+        """
+        Returns the next available output token.
+
+        :return: the next token, None if none available
+        :rtype: Token
+        """
+        result = super(ListFiles, self).output()
+        if result is not None:
+            self._last = result.payload
+        return result
+
 
 class GetStorageValue(Source):
     """
@@ -544,3 +655,354 @@ class StringConstants(Source):
         for s in self.resolve_option("strings"):
             self._output.append(Token(s))
         return None
+
+
+class ReadRecords(Source):
+    """
+    Streams the records (lines, JSON lines or CSV rows) from a text file, which can be compressed.
+    Records are only read from the file when they are requested by the downstream actors.
+    """
+
+    def __init__(self, name=None, config=None):
+        """
+        Initializes the source.
+
+        :param name: the name of the source
+        :type name: str
+        :param config: the dictionary with the options (str -> object).
+        :type config: dict
+        """
+        super(ReadRecords, self).__init__(name=name, config=config)
+        self._records = None
+        self._next = None
+
+    def description(self):
+        """
+        Returns a description of the actor.
+
+        :return: the description
+        :rtype: str
+        """
+        return "Streams the records (lines, JSON lines or CSV rows) from a text file, which can be compressed.\n"\
+               "Records are only read from the file when they are requested by the downstream actors."
+
+    @property
+    def quickinfo(self):
+        """
+        Returns a short string describing some of the options of the actor.
+
+        :return: the info, None if not available
+        :rtype: str
+        """
+        return "file: " + str(self.config["file"]) \
+               + ", format: " + str(self.config["format"]) \
+               + ", batch: " + str(self.config["batch_size"])
+
+    def fix_config(self, options):
+        """
+        Fixes the options, if necessary. I.e., it adds all required elements to the dictionary.
+
+        :param options: the options to fix
+        :type options: dict
+        :return: the (potentially) fixed options
+        :rtype: dict
+        """
+        options = super(ReadRecords, self).fix_config(options)
+
+        opt = "file"
+        if opt not in options:
+            options[opt] = "."
+        if opt not in self.help:
+            self.help[opt] = "The file to read the records from (string)."
+
+        opt = "format"
+        if opt not in options:
+            options[opt] = "lines"
+        if opt not in self.help:
+            self.help[opt] = "The format of the records: lines (string per line), jsonl (parsed JSON object per line, "\
+                             "dictionaries get turned into containers) or csv (container per row) (string)."
+
+        opt = "compression"
+        if opt not in options:
+            options[opt] = "auto"
+        if opt not in self.help:
+            self.help[opt] = "The compression of the file: auto (determined by extension), none, gzip, bz2 or xz "\
+                             "(string)."
+
+        opt = "encoding"
+        if opt not in options:
+            options[opt] = "utf-8"
+        if opt not in self.help:
+            self.help[opt] = "The encoding of the file (string)."
+
+        opt = "buffer_size"
+        if opt not in options:
+            options[opt] = 1048576
+        if opt not in self.help:
+            self.help[opt] = "The size in bytes of the chunks to read from the file, for compressed files the "\
+                             "size of the chunks to decompress (int)."
+
+        opt = "batch_size"
+        if opt not in options:
+            options[opt] = 0
+        if opt not in self.help:
+            self.help[opt] = "The number of records to forward as a list at a time; 0 forwards the records "\
+                             "one by one (int)."
+
+        opt = "offset"
+        if opt not in options:
+            options[opt] = 0
+        if opt not in self.help:
+            self.help[opt] = "The byte offset in the (uncompressed) file to start reading from; must be the start "\
+                             "of a record, e.g., a previously obtained position (int)."
+
+        opt = "header"
+        if opt not in options:
+            options[opt] = True
+        if opt not in self.help:
+            self.help[opt] = "Whether the CSV file has a header row with the column names; otherwise the columns "\
+                             "get named col1, col2, ... (bool)."
+
+        opt = "delimiter"
+        if opt not in options:
+            options[opt] = ","
+        if opt not in self.help:
+            self.help[opt] = "The delimiter to use for CSV files (string)."
+
+        return options
+
+    @property
+    def position(self):
+        """
+        Returns the byte offset in the (uncompressed) file after the last record that was output,
+        can be used for resuming with the 'offset' option or resume_from.
+
+        :return: the offset
+        :rtype: int
+        """
+        return self._position
+
+    def _open(self, fname):
+        """
+        Opens the file for reading in binary mode, taking the compression into account.
+        Decompressed streams get buffered with the buffer size as well.
+
+        :param fname: the file to open
+        :type fname: str
+        :return: the file object
+        """
+        compression = str(self.resolve_option("compression"))
+        buffer_size = int(self.resolve_option("buffer_size"))
+        if compression == "auto":
+            ext = os.path.splitext(fname)[1].lower()
+            if ext == ".gz":
+                compression = "gzip"
+            elif ext == ".bz2":
+                compression = "bz2"
+            elif ext in [".xz", ".lzma"]:
+                compression = "xz"
+            else:
+                compression = "none"
+        if compression == "none":
+            return open(fname, "rb", buffering=buffer_size)
+        elif compression == "gzip":
+            import gzip
+            raw = gzip.open(fname, "rb")
+        elif compression == "bz2":
+            import bz2
+            raw = bz2.open(fname, "rb")
+        elif compression == "xz":
+            import lzma
+            raw = lzma.open(fname, "rb")
+        else:
+            raise Exception("Unsupported compression: " + compression)
+        return io.BufferedReader(raw, buffer_size)
+
+    def _lines(self, f, encoding, offset):
+        """
+        Generates (decoded line, end offset) tuples from the file.
+
+        :param f: the file to read from
+        :param encoding: the encoding of the file
+        :type encoding: str
+        :param offset: the offset of the first line
+        :type offset: int
+        """
+        for line in f:
+            offset += len(line)
+            yield line.decode(encoding), offset
+
+    def _iterate(self, fname, offset):
+        """
+        Generates (record, end offset) tuples from the file.
+
+        :param fname: the file to read
+        :type fname: str
+        :param offset: the byte offset to start reading from
+        :type offset: int
+        """
+        fmt = str(self.resolve_option("format"))
+        encoding = str(self.resolve_option("encoding"))
+
+        with self._open(fname) as f:
+            if offset > 0:
+                f.seek(offset)
+
+            if fmt == "lines":
+                for line, end in self._lines(f, encoding, offset):
+                    yield line.rstrip("\r\n"), end
+
+            elif fmt == "jsonl":
+                for line, end in self._lines(f, encoding, offset):
+                    if len(line.strip()) == 0:
+                        continue
+                    obj = json.loads(line)
+                    if isinstance(obj, dict):
+                        cont = Container()
+                        for k in obj:
+                            cont.set(k, obj[k])
+                        obj = cont
+                    yield obj, end
+
+            elif fmt == "csv":
+                lines = self._lines(f, encoding, offset)
+                state = {"end": offset}
+
+                def text():
+                    for l, e in lines:
+                        state["end"] = e
+                        yield l
+
+                delimiter = str(self.resolve_option("delimiter"))
+                reader = csv.reader(text(), delimiter=delimiter)
+                names = None
+                if bool(self.resolve_option("header")):
+                    if offset > 0:
+                        # resuming: the header is only available at the start of the file
+                        with self._open(fname) as fh:
+                            names = next(csv.reader([fh.readline().decode(encoding)], delimiter=delimiter), None)
+                    else:
+                        names = next(reader, None)
+                cls = None
+                for row in reader:
+                    if names is None:
+                        names = ["col" + str(i + 1) for i in range(len(row))]
+                    if cls is None:
+                        cls = container_class("CSVRow", unique_names(names))
+                        num = len(names)
+                    if len(row) > num:
+                        row = row[:num]
+                    elif len(row) < num:
+                        row = row + [None] * (num - len(row))
+                    yield cls(row), state["end"]
+
+            else:
+                raise Exception("Unsupported format: " + fmt)
+
+    def _batches(self, records, batch_size):
+        """
+        Generates (list of records, end offset) tuples.
+
+        :param records: the generator for the individual records
+        :param batch_size: the maximum number of records per batch
+        :type batch_size: int
+        """
+        batch = []
+        end = None
+        for record, end in records:
+            batch.append(record)
+            if len(batch) >= batch_size:
+                yield batch, end
+                batch = []
+        if len(batch) > 0:
+            yield batch, end
+
+    def _close(self):
+        """
+        Closes the file, if still open.
+        """
+        if self._records is not None:
+            self._records.close()
+            self._records = None
+        self._next = None
+
+    def pre_execute(self):
+        """
+        Gets executed before the actual execution.
+
+        :return: None if successful, otherwise error message
+        :rtype: str
+        """
+        self._close()
+        return super(ReadRecords, self).pre_execute()
+
+    def clear_output(self):
+        """
+        Removes all pending output tokens, i.e., closes the file.
+        """
+        super(ReadRecords, self).clear_output()
+        self._close()
+
+    def do_execute(self):
+        """
+        The actual execution of the actor.
+
+        :return: None if successful, otherwise error message
+        :rtype: str
+        """
+        fname = str(self.resolve_option("file"))
+        if not os.path.isfile(fname):
+            return "File '" + fname + "' does not exist or is not a file!"
+        if self._resume_position is not None:
+            self._position = int(self._resume_position)
+            self._resume_position = None
+        else:
+            self._position = int(self.resolve_option("offset"))
+        self._records = self._iterate(fname, self._position)
+        batch_size = int(self.resolve_option("batch_size"))
+        if batch_size > 0:
+            self._records = self._batches(self._records, batch_size)
+        return None
+
+    def has_output(self):
+        """
+        Checks whether any output tokens are present.
+
+        :return: true if at least one output token present
+        :rtype: bool
+        """
+        if (self._next is None) and (self._records is not None):
+            try:
+                self._next = next(self._records)
+            except StopIteration:
+                self._records = None
+            except Exception:
+                # reading happens outside the execution, hence the error gets reported to the director
+                msg = "Failed to read record after byte offset " + str(self._position) + " of '" \
+                      + str(self.resolve_option("file")) + "':\n" + traceback.format_exc()
+                self._close()
+                if self.parent is not None:
+                    self.parent.director.report_error(self, msg)
+                else:
+                    self.logger.error(msg)
+        return self._next is not None
+
+    def output(self):
+        """
+        Returns the next available output token.
+
+        :return: the next token, None if none available
+        :rtype: Token
+        """
+        if not self.has_output():
+            return None
+        record, self._position = self._next
+        self._next = None
+        return Token(record)
+
+    def wrapup(self):
+        """
+        Finishes up after execution finishes, does not remove any graphical output.
+        """
+        self._close()
+        super(ReadRecords, self).wrapup()
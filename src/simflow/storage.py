@@ -0,0 +1,989 @@
+import os
+import pickle
+import struct
+import sys
+import tempfile
+import threading
+
+from array import array
+from collections import OrderedDict
+from collections.abc import MutableMapping
+from confobj import Configurable
+
+DEFAULT_STRIPES = 64
+""" the number of locks to distribute the keys across for the atomic operations """
+
+_locks = [threading.RLock() for _ in range(DEFAULT_STRIPES)]
+""" the locks for storages that are not derived from Storage, e.g., dictionaries """
+
+_MISSING = object()
+""" marker for missing values """
+
+SNAPSHOT_MAGIC = b"SIMFLOW-SNAPSHOT-2\n"
+""" the header of storage snapshot files """
+
+
+class Storage(Configurable, MutableMapping):
+    """
+    Ancestor for storage backends that can be used by flows instead of a plain dictionary.
+    Backends behave like dictionaries with string keys.
+    """
+
+    def __init__(self, config=None):
+        """
+        Initializes the storage.
+
+        :param config: dictionary of options to use
+        :type config: dict
+        """
+        super(Storage, self).__init__(config=config)
+        self._locks = [threading.RLock() for _ in range(DEFAULT_STRIPES)]
+
+    def lock(self, key):
+        """
+        Returns the lock responsible for the key, used by the atomic operations.
+
+        :param key: the key to get the lock for
+        :type key: str
+        :return: the lock
+        :rtype: threading.RLock
+        """
+        return self._locks[hash(key) % len(self._locks)]
+
+    def __str__(self):
+        """
+        Returns a short representation of the storage's setup.
+
+        :return: the setup
+        :rtype: str
+        """
+        return self.get_classname(self) + ": " + str(self._config)
+
+    def close(self):
+        """
+        Releases the external resources held by the storage (e.g., file handles, shared memory mappings).
+        The stored values remain available, the resources get acquired again when required.
+        """
+        pass
+
+    def destroy(self):
+        """
+        Releases all resources held by the storage, including temporary files and shared memory blocks.
+        Values that only lived in these resources are lost.
+        """
+        self.close()
+
+
+class DictStorage(Storage):
+    """
+    Stores the values in a plain dictionary.
+    """
+
+    def __init__(self, config=None):
+        """
+        Initializes the storage.
+
+        :param config: dictionary of options to use
+        :type config: dict
+        """
+        super(DictStorage, self).__init__(config=config)
+        self._data = {}
+
+    def description(self):
+        """
+        Returns the description for the storage.
+
+        :return: the description
+        :rtype: str
+        """
+        return "Stores the values in a plain dictionary."
+
+    def __getitem__(self, key):
+        """
+        Returns the value stored under the key.
+
+        :param key: the key of the value
+        :type key: str
+        :return: the value
+        :rtype: object
+        """
+        return self._data[key]
+
+    def __setitem__(self, key, value):
+        """
+        Stores the value under the key.
+
+        :param key: the key of the value
+        :type key: str
+        :param value: the value to store
+        :type value: object
+        """
+        self._data[key] = value
+
+    def __delitem__(self, key):
+        """
+        Removes the value stored under the key.
+
+        :param key: the key of the value
+        :type key: str
+        """
+        del self._data[key]
+
+    def __contains__(self, key):
+        """
+        Checks whether a value is stored under the key.
+
+        :param key: the key to check
+        :type key: str
+        :return: True if present
+        :rtype: bool
+        """
+        return key in self._data
+
+    def __iter__(self):
+        """
+        Returns an iterator over (a snapshot of) the keys.
+
+        :return: the iterator
+        """
+        return iter(list(self._data))
+
+    def __len__(self):
+        """
+        Returns the number of stored values.
+
+        :return: the number of values
+        :rtype: int
+        """
+        return len(self._data)
+
+
+class StripedLockStorage(DictStorage):
+    """
+    Thread-safe dictionary, with the keys being distributed across a fixed number of locks.
+    """
+
+    def __init__(self, config=None):
+        """
+        Initializes the storage.
+
+        :param config: dictionary of options to use
+        :type config: dict
+        """
+        super(StripedLockStorage, self).__init__(config=config)
+        self._locks = [threading.RLock() for _ in range(max(1, int(self.config["stripes"])))]
+
+    def description(self):
+        """
+        Returns the description for the storage.
+
+        :return: the description
+        :rtype: str
+        """
+        return "Thread-safe dictionary, with the keys being distributed across a fixed number of locks."
+
+    def fix_config(self, options):
+        """
+        Fixes the options, if necessary. I.e., it adds all required elements to the dictionary.
+
+        :param options: the options to fix
+        :type options: dict
+        :return: the (potentially) fixed options
+        :rtype: dict
+        """
+        options = super(StripedLockStorage, self).fix_config(options)
+
+        opt = "stripes"
+        if opt not in options:
+            options[opt] = 16
+        if opt not in self.help:
+            self.help[opt] = "The number of locks to distribute the keys across (int)."
+
+        return options
+
+    def __getitem__(self, key):
+        """
+        Returns the value stored under the key.
+
+        :param key: the key of the value
+        :type key: str
+        :return: the value
+        :rtype: object
+        """
+        with self.lock(key):
+            return self._data[key]
+
+    def __setitem__(self, key, value):
+        """
+        Stores the value under the key.
+
+        :param key: the key of the value
+        :type key: str
+        :param value: the value to store
+        :type value: object
+        """
+        with self.lock(key):
+            self._data[key] = value
+
+    def __delitem__(self, key):
+        """
+        Removes the value stored under the key.
+
+        :param key: the key of the value
+        :type key: str
+        """
+        with self.lock(key):
+            del self._data[key]
+
+
+class SharedMemoryStorage(DictStorage):
+    """
+    Stores bytes and numeric arrays (array.array, NumPy arrays) in shared memory blocks, which
+    other processes can attach to via the descriptors of the values. All other values are kept
+    in process memory. Within the process, bytes only get copied on the first read, NumPy arrays
+    are returned as read-only views on the shared memory and array.array objects get copied.
+    Closing the storage only unmaps the blocks, which stay available to other processes (and get mapped
+    again when read); the blocks get removed when their values get deleted or the storage gets destroyed.
+    """
+
+    def __init__(self, config=None):
+        """
+        Initializes the storage.
+
+        :param config: dictionary of options to use
+        :type config: dict
+        """
+        super(SharedMemoryStorage, self).__init__(config=config)
+        self._blocks = {}
+        self._values = {}
+
+    def description(self):
+        """
+        Returns the description for the storage.
+
+        :return: the description
+        :rtype: str
+        """
+        return "Stores bytes and numeric arrays (array.array, NumPy arrays) in shared memory blocks, which "\
+               "other processes can attach to via the descriptors of the values. All other values are kept "\
+               "in process memory."
+
+    @classmethod
+    def _describe(cls, value):
+        """
+        Determines how to store the value in shared memory.
+
+        :param value: the value to check
+        :type value: object
+        :return: tuple of kind, metadata and bytes-like object, None if not supported
+        :rtype: tuple
+        """
+        if isinstance(value, (bytes, bytearray, memoryview)):
+            return "bytes", None, memoryview(value).cast("B")
+        if isinstance(value, array):
+            return "array", value.typecode, memoryview(value).cast("B")
+        if (value.__class__.__module__ == "numpy") and (value.__class__.__name__ == "ndarray") \
+                and (value.dtype.kind in "biufc"):
+            return "numpy", (value.dtype.str, value.shape), memoryview(value.tobytes())
+        return None
+
+    @classmethod
+    def attach(cls, descriptor):
+        """
+        Retrieves the value from shared memory using its descriptor, e.g., in another process.
+        NumPy arrays get copied.
+
+        :param descriptor: the descriptor of the value (see 'descriptor' method)
+        :type descriptor: tuple
+        :return: the value
+        :rtype: object
+        """
+        from multiprocessing import shared_memory
+        name, kind, meta, size = descriptor
+        shm = shared_memory.SharedMemory(name=name)
+        try:
+            return cls._restore(shm, kind, meta, size)
+        finally:
+            shm.close()
+
+    @classmethod
+    def _restore(cls, shm, kind, meta, size):
+        """
+        Restores the value from the shared memory block.
+
+        :param shm: the shared memory block
+        :param kind: the kind of value (bytes, array, numpy)
+        :type kind: str
+        :param meta: the metadata for restoring the value
+        :param size: the number of bytes used by the value
+        :type size: int
+        :return: the value
+        :rtype: object
+        """
+        data = bytes(shm.buf[:size])
+        if kind == "bytes":
+            return data
+        elif kind == "array":
+            result = array(meta)
+            result.frombytes(data)
+            return result
+        else:
+            import numpy
+            dtype, shape = meta
+            return numpy.frombuffer(data, dtype=dtype).reshape(shape)
+
+    def descriptor(self, key):
+        """
+        Returns the descriptor for a value stored in shared memory, which can be passed to other processes.
+
+        :param key: the key of the value
+        :type key: str
+        :return: the descriptor (name, kind, metadata, size), None if not stored in shared memory
+        :rtype: tuple
+        """
+        if key not in self._blocks:
+            return None
+        shm, kind, meta, size = self._blocks[key]
+        return shm.name, kind, meta, size
+
+    @classmethod
+    def _unmap(cls, shm):
+        """
+        Unmaps the shared memory block in this process, the block itself stays available.
+
+        :param shm: the shared memory block
+        """
+        if shm.buf is None:
+            return
+        try:
+            shm.close()
+        except BufferError:
+            # views are still in use, the mapping gets released with them
+            pass
+
+    def _block(self, key):
+        """
+        Returns the shared memory block of the key, mapping it again if it was closed.
+
+        :param key: the key to get the block for
+        :type key: str
+        :return: tuple of shared memory block, kind, metadata and size
+        :rtype: tuple
+        """
+        shm, kind, meta, size = self._blocks[key]
+        if shm.buf is None:
+            from multiprocessing import shared_memory
+            shm = shared_memory.SharedMemory(name=shm.name)
+            self._blocks[key] = (shm, kind, meta, size)
+        return shm, kind, meta, size
+
+    def _release(self, key):
+        """
+        Removes the shared memory block of the key, if any.
+
+        :param key: the key to release the block for
+        :type key: str
+        """
+        self._values.pop(key, None)
+        if key in self._blocks:
+            shm = self._blocks.pop(key)[0]
+            self._unmap(shm)
+            shm.unlink()
+
+    def __getitem__(self, key):
+        """
+        Returns the value stored under the key.
+
+        :param key: the key of the value
+        :type key: str
+        :return: the value
+        :rtype: object
+        """
+        if key in self._values:
+            return self._values[key]
+        if key in self._blocks:
+            shm, kind, meta, size = self._block(key)
+            if kind == "array":
+                return self._restore(shm, kind, meta, size)
+            if kind == "bytes":
+                value = bytes(shm.buf[:size])
+            else:
+                import numpy
+                dtype, shape = meta
+                value = numpy.frombuffer(shm.buf, dtype=dtype, count=int(numpy.prod(shape))).reshape(shape)
+                value.flags.writeable = False
+            self._values[key] = value
+            return value
+        return self._data[key]
+
+    def __setitem__(self, key, value):
+        """
+        Stores the value under the key.
+
+        :param key: the key of the value
+        :type key: str
+        :param value: the value to store
+        :type value: object
+        """
+        from multiprocessing import shared_memory
+        self._release(key)
+        self._data.pop(key, None)
+        desc = self._describe(value)
+        if desc is None:
+            self._data[key] = value
+            return
+        kind, meta, data = desc
+        shm = shared_memory.SharedMemory(create=True, size=max(1, data.nbytes))
+        shm.buf[:data.nbytes] = data
+        self._blocks[key] = (shm, kind, meta, data.nbytes)
+
+    def __delitem__(self, key):
+        """
+        Removes the value stored under the key.
+
+        :param key: the key of the value
+        :type key: str
+        """
+        if key in self._blocks:
+            self._release(key)
+        else:
+            del self._data[key]
+
+    def __contains__(self, key):
+        """
+        Checks whether a value is stored under the key.
+
+        :param key: the key to check
+        :type key: str
+        :return: True if present
+        :rtype: bool
+        """
+        return (key in self._blocks) or (key in self._data)
+
+    def __iter__(self):
+        """
+        Returns an iterator over (a snapshot of) the keys.
+
+        :return: the iterator
+        """
+        return iter(list(self._blocks) + list(self._data))
+
+    def __len__(self):
+        """
+        Returns the number of stored values.
+
+        :return: the number of values
+        :rtype: int
+        """
+        return len(self._blocks) + len(self._data)
+
+    def close(self):
+        """
+        Unmaps the shared memory blocks in this process. The blocks stay available, e.g., to other processes.
+        """
+        for shm, kind, meta, size in self._blocks.values():
+            self._unmap(shm)
+
+    def destroy(self):
+        """
+        Removes all shared memory blocks, along with their values.
+        """
+        for key in list(self._blocks):
+            self._release(key)
+
+
+class SpillStorage(Storage):
+    """
+    Keeps the most recently used values in memory and moves (spills) the others as well as large
+    values into an SQLite database on disk. Values must be picklable.
+    Caution: changes to objects obtained from the storage are only retained while they are held
+    in memory, store them again after modifying them.
+    Closing the storage closes the database connection, which gets opened again when required; a temporary
+    database only gets removed once it is empty or the storage gets destroyed.
+    """
+
+    def __init__(self, config=None):
+        """
+        Initializes the storage.
+
+        :param config: dictionary of options to use
+        :type config: dict
+        """
+        super(SpillStorage, self).__init__(config=config)
+        self._hot = OrderedDict()
+        self._hot_size = 0
+        self._conn = None
+        self._db_file = None
+        self._temp = False
+        self._lock = threading.RLock()
+        if len(str(self.config["db_file"])) > 0:
+            self._db()
+
+    def description(self):
+        """
+        Returns the description for the storage.
+
+        :return: the description
+        :rtype: str
+        """
+        return "Keeps the most recently used values in memory and moves (spills) the others as well as large "\
+               "values into an SQLite database on disk. Values must be picklable.\n"\
+               "Caution: changes to objects obtained from the storage are only retained while they are held "\
+               "in memory, store them again after modifying them."
+
+    def fix_config(self, options):
+        """
+        Fixes the options, if necessary. I.e., it adds all required elements to the dictionary.
+
+        :param options: the options to fix
+        :type options: dict
+        :return: the (potentially) fixed options
+        :rtype: dict
+        """
+        options = super(SpillStorage, self).fix_config(options)
+
+        opt = "db_file"
+        if opt not in options:
+            options[opt] = ""
+        if opt not in self.help:
+            self.help[opt] = "The SQLite database to spill the values to; uses a temporary file if empty (string)."
+
+        opt = "max_memory"
+        if opt not in options:
+            options[opt] = 64 * 1024 * 1024
+        if opt not in self.help:
+            self.help[opt] = "The maximum (approximate) size in bytes of the values to keep in memory (int)."
+
+        opt = "spill_threshold"
+        if opt not in options:
+            options[opt] = 1024 * 1024
+        if opt not in self.help:
+            self.help[opt] = "The (approximate) size in bytes above which values get stored on disk straight "\
+                             "away (int)."
+
+        return options
+
+    def _db(self):
+        """
+        Returns the database connection, initializing it if necessary.
+
+        :return: the connection
+        :rtype: sqlite3.Connection
+        """
+        if self._conn is None:
+            import sqlite3
+            if self._db_file is None:
+                fname = str(self.config["db_file"])
+                self._temp = len(fname) == 0
+                if self._temp:
+                    fd, fname = tempfile.mkstemp(suffix=".db")
+                    os.close(fd)
+                self._db_file = fname
+            self._conn = sqlite3.connect(self._db_file, check_same_thread=False)
+            self._conn.execute("CREATE TABLE IF NOT EXISTS storage (key TEXT PRIMARY KEY, value BLOB)")
+        return self._conn
+
+    @classmethod
+    def _size_of(cls, value):
+        """
+        Returns the approximate size of the value in bytes.
+
+        :param value: the value to determine the size for
+        :type value: object
+        :return: the size
+        :rtype: int
+        """
+        if hasattr(value, "nbytes"):
+            return int(value.nbytes)
+        return sys.getsizeof(value)
+
+    def _spill(self, key, value):
+        """
+        Writes the value to disk.
+
+        :param key: the key of the value
+        :type key: str
+        :param value: the value to write
+        :type value: object
+        """
+        data = pickle.dumps(value, protocol=pickle.HIGHEST_PROTOCOL)
+        self._db().execute("INSERT OR REPLACE INTO storage (key, value) VALUES (?, ?)", (key, data))
+
+    def _evict(self):
+        """
+        Moves the least recently used values to disk until the memory limit is met.
+        """
+        max_memory = int(self.config["max_memory"])
+        while (self._hot_size > max_memory) and (len(self._hot) > 0):
+            key, (value, size) = self._hot.popitem(last=False)
+            self._hot_size -= size
+            self._spill(key, value)
+
+    def __getitem__(self, key):
+        """
+        Returns the value stored under the key.
+
+        :param key: the key of the value
+        :type key: str
+        :return: the value
+        :rtype: object
+        """
+        with self._lock:
+            if key in self._hot:
+                self._hot.move_to_end(key)
+                return self._hot[key][0]
+            row = None
+            if self._db_file is not None:
+                row = self._db().execute("SELECT value FROM storage WHERE key = ?", (key,)).fetchone()
+            if row is None:
+                raise KeyError(key)
+            value = pickle.loads(row[0])
+            size = self._size_of(value)
+            if size <= int(self.config["spill_threshold"]):
+                self._conn.execute("DELETE FROM storage WHERE key = ?", (key,))
+                self._hot[key] = (value, size)
+                self._hot_size += size
+                self._evict()
+            return value
+
+    def __setitem__(self, key, value):
+        """
+        Stores the value under the key.
+
+        :param key: the key of the value
+        :type key: str
+        :param value: the value to store
+        :type value: object
+        """
+        if not isinstance(key, str):
+            raise TypeError("Only string keys supported: " + str(key))
+        with self._lock:
+            self._discard(key)
+            size = self._size_of(value)
+            if size > int(self.config["spill_threshold"]):
+                self._spill(key, value)
+            else:
+                self._hot[key] = (value, size)
+                self._hot_size += size
+                self._evict()
+
+    def _discard(self, key):
+        """
+        Removes the key from memory and disk.
+
+        :param key: the key to remove
+        :type key: str
+        :return: whether the key was present
+        :rtype: bool
+        """
+        result = False
+        if key in self._hot:
+            self._hot_size -= self._hot.pop(key)[1]
+            result = True
+        if self._db_file is not None:
+            result = (self._db().execute("DELETE FROM storage WHERE key = ?", (key,)).rowcount > 0) or result
+        return result
+
+    def __delitem__(self, key):
+        """
+        Removes the value stored under the key.
+
+        :param key: the key of the value
+        :type key: str
+        """
+        with self._lock:
+            if not self._discard(key):
+                raise KeyError(key)
+
+    def __contains__(self, key):
+        """
+        Checks whether a value is stored under the key.
+
+        :param key: the key to check
+        :type key: str
+        :return: True if present
+        :rtype: bool
+        """
+        with self._lock:
+            if key in self._hot:
+                return True
+            if self._db_file is None:
+                return False
+            return self._db().execute("SELECT 1 FROM storage WHERE key = ?", (key,)).fetchone() is not None
+
+    def __iter__(self):
+        """
+        Returns an iterator over (a snapshot of) the keys.
+
+        :return: the iterator
+        """
+        with self._lock:
+            keys = list(self._hot)
+            if self._db_file is not None:
+                keys.extend(row[0] for row in self._db().execute("SELECT key FROM storage"))
+        return iter(keys)
+
+    def __len__(self):
+        """
+        Returns the number of stored values.
+
+        :return: the number of values
+        :rtype: int
+        """
+        with self._lock:
+            result = len(self._hot)
+            if self._db_file is not None:
+                result += self._db().execute("SELECT COUNT(*) FROM storage").fetchone()[0]
+        return result
+
+    def close(self):
+        """
+        Closes the database connection, the values remain available. A temporary database gets
+        removed if no values are stored in it.
+        """
+        with self._lock:
+            if self._db_file is None:
+                return
+            empty = self._temp and (self._db().execute("SELECT COUNT(*) FROM storage").fetchone()[0] == 0)
+            self._conn.commit()
+            self._conn.close()
+            self._conn = None
+            if empty:
+                self._remove_temp()
+
+    def _remove_temp(self):
+        """
+        Removes the temporary database, if any.
+        """
+        if self._temp and os.path.exists(self._db_file):
+            os.remove(self._db_file)
+        if self._temp:
+            self._db_file = None
+
+    def destroy(self):
+        """
+        Releases all resources held by the storage, removing all values (unless stored in a
+        user-supplied database, which receives all values held in memory).
+        """
+        with self._lock:
+            if (len(self._hot) > 0) and (len(str(self.config["db_file"])) > 0):
+                for key, (value, size) in self._hot.items():
+                    self._spill(key, value)
+            self._hot = OrderedDict()
+            self._hot_size = 0
+            if self._conn is not None:
+                self._conn.commit()
+                self._conn.close()
+                self._conn = None
+            self._remove_temp()
+
+
+def lock_for(storage, key):
+    """
+    Returns the lock responsible for the key in the storage.
+
+    :param storage: the storage (Storage or dictionary)
+    :type storage: dict
+    :param key: the key to get the lock for
+    :type key: str
+    :return: the lock
+    :rtype: threading.RLock
+    """
+    if isinstance(storage, Storage):
+        return storage.lock(key)
+    return _locks[hash((id(storage), key)) % len(_locks)]
+
+
+def merge(storage, key, func, default=None):
+    """
+    Atomically replaces the value with the result of the function applied to the current value.
+    The operation is only atomic with respect to other atomic operations on the same key.
+
+    :param storage: the storage (Storage or dictionary)
+    :type storage: dict
+    :param key: the key of the value
+    :type key: str
+    :param func: the function that receives the current value (or the default) and returns the new value
+    :param default: the value to use if the key is not present
+    :type default: object
+    :return: the new value
+    :rtype: object
+    """
+    with lock_for(storage, key):
+        value = storage.get(key, _MISSING)
+        if value is _MISSING:
+            value = default
+        value = func(value)
+        storage[key] = value
+        return value
+
+
+def increment(storage, key, delta=1, default=0):
+    """
+    Atomically adds the delta to the value.
+
+    :param storage: the storage (Storage or dictionary)
+    :type storage: dict
+    :param key: the key of the value
+    :type key: str
+    :param delta: the amount to add
+    :type delta: object
+    :param default: the value to use if the key is not present
+    :type default: object
+    :return: the new value
+    :rtype: object
+    """
+    return merge(storage, key, lambda x: x + delta, default=default)
+
+
+def append(storage, key, value):
+    """
+    Atomically appends the value to the list stored under the key, creating the list if necessary.
+
+    :param storage: the storage (Storage or dictionary)
+    :type storage: dict
+    :param key: the key of the list
+    :type key: str
+    :param value: the value to append
+    :type value: object
+    :return: the list
+    :rtype: list
+    """
+    def _append(x):
+        if x is None:
+            x = []
+        x.append(value)
+        return x
+    return merge(storage, key, _append)
+
+
+def compare_and_set(storage, key, expected, value):
+    """
+    Atomically stores the value if the current value equals the expected one.
+
+    :param storage: the storage (Storage or dictionary)
+    :type storage: dict
+    :param key: the key of the value
+    :type key: str
+    :param expected: the expected current value, None if the key must not be present
+    :type expected: object
+    :param value: the new value
+    :type value: object
+    :return: whether the value was stored
+    :rtype: bool
+    """
+    with lock_for(storage, key):
+        current = storage.get(key, _MISSING)
+        if current is _MISSING:
+            current = None
+        if (current is expected) or (current == expected):
+            storage[key] = value
+            return True
+        return False
+
+
+def put_if_absent(storage, key, value):
+    """
+    Atomically stores the value if the key is not present yet.
+
+    :param storage: the storage (Storage or dictionary)
+    :type storage: dict
+    :param key: the key of the value
+    :type key: str
+    :param value: the value to store
+    :type value: object
+    :return: the value stored under the key after the operation
+    :rtype: object
+    """
+    with lock_for(storage, key):
+        current = storage.get(key, _MISSING)
+        if current is _MISSING:
+            storage[key] = value
+            return value
+        return current
+
+
+def save_snapshot(storage, fname):
+    """
+    Writes the values of the storage to a snapshot file, using pickle protocol 5 with the data
+    of buffers (e.g., bytes, arrays) being written out-of-band. Each value gets pickled separately
+    (only once), values that cannot be pickled get skipped. The file gets replaced atomically.
+
+    :param storage: the storage (Storage or dictionary) to save
+    :type storage: dict
+    :param fname: the snapshot file to write
+    :type fname: str
+    :return: the keys of the values that were skipped
+    :rtype: list
+    """
+    # key -> (index of the pickled value, index of its first out-of-band buffer, number of buffers)
+    entries = {}
+    buffers = []
+    skipped = []
+    for key in list(storage):
+        value_buffers = []
+
+        def out_of_band(buf):
+            try:
+                value_buffers.append(buf.raw())
+            except BufferError:
+                return True
+            return False
+
+        try:
+            pickled = pickle.dumps(storage.get(key), protocol=5, buffer_callback=out_of_band)
+        except Exception:
+            skipped.append(key)
+            continue
+        entries[key] = (len(buffers), len(buffers) + 1, len(value_buffers))
+        buffers.append(memoryview(pickled))
+        buffers.extend(value_buffers)
+
+    main = pickle.dumps(entries, protocol=5)
+    dirname = os.path.dirname(os.path.abspath(fname))
+    fd, tmp = tempfile.mkstemp(dir=dirname, suffix=".tmp")
+    try:
+        with os.fdopen(fd, "wb") as f:
+            f.write(SNAPSHOT_MAGIC)
+            f.write(struct.pack("<QQ", len(main), len(buffers)))
+            f.write(main)
+            for buf in buffers:
+                f.write(struct.pack("<Q", buf.nbytes))
+                f.write(buf)
+        os.replace(tmp, fname)
+    except Exception:
+        if os.path.exists(tmp):
+            os.remove(tmp)
+        raise
+    return skipped
+
+
+def load_snapshot(fname):
+    """
+    Reads the values from a snapshot file written by save_snapshot.
+
+    :param fname: the snapshot file to read
+    :type fname: str
+    :return: the values (key -> value)
+    :rtype: dict
+    """
+    with open(fname, "rb") as f:
+        content = memoryview(f.read())
+    magic = bytes(content[:len(SNAPSHOT_MAGIC)])
+    if magic != SNAPSHOT_MAGIC:
+        raise Exception("Not a storage snapshot: " + fname)
+    pos = len(SNAPSHOT_MAGIC)
+    size, num = struct.unpack_from("<QQ", content, pos)
+    pos += 16
+    main = content[pos:pos + size]
+    pos += size
+    buffers = []
+    for i in range(num):
+        nbytes = struct.unpack_from("<Q", content, pos)[0]
+        pos += 8
+        buffers.append(content[pos:pos + nbytes])
+        pos += nbytes
+    result = {}
+    for key, (index, start, count) in pickle.loads(main).items():
+        result[key] = pickle.loads(buffers[index], buffers=buffers[start:start + count])
+    return result
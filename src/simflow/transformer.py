@@ -1,7 +1,6 @@
 import math   # required for eval of MathExpression actor
 import os
 import re
-import simflow.conversion as conversion
 from simflow.base import InputConsumer, OutputProducer, Token
 
 
@@ -85,6 +84,7 @@ class Convert(Transformer):
         :type config: dict
         """
         super(Convert, self).__init__(name=name, config=config)
+        self._cache = None
 
     def description(self):
         """
@@ -116,10 +116,32 @@ class Convert(Transformer):
         """
         opt = "setup"
         if opt not in options:
+            import simflow.conversion as conversion
             options[opt] = conversion.PassThrough()
         if opt not in self.help:
             self.help[opt] = "The conversion to apply to the input data (Conversion)."
 
+        opt = "batch"
+        if opt not in options:
+            options[opt] = False
+        if opt not in self.help:
+            self.help[opt] = "Whether the payload is a list of objects to convert in one go, using the conversion's "\
+                             "batch method; forwards the list of converted objects (bool)."
+
+        opt = "cache_dir"
+        if opt not in options:
+            options[opt] = ""
+        if opt not in self.help:
+            self.help[opt] = "The directory for caching the conversion results across flow runs; no caching if "\
+                             "empty (string)."
+
+        opt = "cache_size"
+        if opt not in options:
+            options[opt] = 0
+        if opt not in self.help:
+            self.help[opt] = "The maximum size in MB of the cache directory, removing the least recently used "\
+                             "results when exceeded; 0 for unlimited (int)."
+
         return super(Convert, self).fix_config(options)
 
     def check_input(self, token):
@@ -131,27 +153,120 @@ class Convert(Transformer):
         """
         if token is None:
             raise Exception(self.full_name + ": No token provided!")
-        self.config["setup"].check_input(token.payload)
+        if bool(self.resolve_option("batch")):
+            if not isinstance(token.payload, (list, tuple)):
+                raise Exception(self.full_name + ": Expected list of objects, but got: " + str(type(token.payload)))
+            for obj in token.payload:
+                self.config["setup"].check_input(obj)
+        else:
+            self.config["setup"].check_input(token.payload)
 
-    def do_execute(self):
+    def setup(self):
         """
-        The actual execution of the actor.
+        Configures the actor before execution.
 
         :return: None if successful, otherwise error message
         :rtype: str
         """
+        result = super(Convert, self).setup()
+        if result is None:
+            self._cache = None
+            cache_dir = str(self.resolve_option("cache_dir"))
+            if len(cache_dir) > 0:
+                try:
+                    import simflow.conversion as conversion
+                    self._cache = conversion.ConversionCache(
+                        cache_dir, max_size=int(self.resolve_option("cache_size")) * 1024 * 1024)
+                except Exception as e:
+                    result = "Failed to initialize cache in '" + cache_dir + "': " + str(e)
+        return result
+
+    def _convert(self, obj):
+        """
+        Converts the object, using the cache if available.
+
+        :param obj: the object to convert
+        :type obj: object
+        :return: tuple of error message (None if successful) and converted object
+        :rtype: tuple
+        """
+        key = None
+        if self._cache is not None:
+            key = self._cache.key(self.config["setup"], obj)
+            if key is not None:
+                found, output = self._cache.get(key)
+                if found:
+                    return None, output
+
         conv = self.config["setup"].shallow_copy()
-        conv.input = self._input.payload
+        conv.input = obj
         result = conv.convert()
+        if (result is None) and (key is not None):
+            msg = self._cache.put(key, conv.output)
+            if msg is not None:
+                self.logger.warning(msg)
+        return result, conv.output
+
+    def _convert_batch(self, objs):
+        """
+        Converts the list of objects in one go, using the cache if available.
+
+        :param objs: the objects to convert
+        :type objs: list
+        :return: tuple of error message (None if successful) and list of converted objects
+        :rtype: tuple
+        """
+        outputs = [None] * len(objs)
+        keys = [None] * len(objs)
+        todo = []
+        for i, obj in enumerate(objs):
+            if self._cache is not None:
+                keys[i] = self._cache.key(self.config["setup"], obj)
+                if keys[i] is not None:
+                    found, output = self._cache.get(keys[i])
+                    if found:
+                        outputs[i] = output
+                        continue
+            todo.append(i)
+
+        if len(todo) > 0:
+            conv = self.config["setup"].shallow_copy()
+            result = conv.convert_batch([objs[i] for i in todo])
+            if result is not None:
+                return result, None
+            for i, output in zip(todo, conv.output):
+                outputs[i] = output
+                if keys[i] is not None:
+                    msg = self._cache.put(keys[i], output)
+                    if msg is not None:
+                        self.logger.warning(msg)
+        return None, outputs
+
+    def do_execute(self):
+        """
+        The actual execution of the actor.
+
+        :return: None if successful, otherwise error message
+        :rtype: str
+        """
+        if bool(self.resolve_option("batch")):
+            result, output = self._convert_batch(list(self._input.payload))
+        else:
+            result, output = self._convert(self._input.payload)
         if result is None:
-            if conv.output is not None:
-                self._output.append(Token(conv.output))
+            if output is not None:
+                self._output.append(Token(output))
         return None
 
 
 class DeleteFile(Transformer):
     """
     Deletes the incoming files that match the regular expression.
+    Deletions can be collected into batches that get processed by a pool of threads.
+    Files that fail to get deleted result in an error, unless 'fail_on_error' is off (they only get
+    logged and counted then); failures in batches get reported once the batch has been processed.
+    NB: the tokens are always forwarded immediately, i.e., in batch mode a file may still exist when its
+    token gets passed on; the remaining batch is only deleted when the flow finishes.
     """
 
     def __init__(self, name=None, config=None):
@@ -164,6 +279,14 @@ class DeleteFile(Transformer):
         :type config: dict
         """
         super(DeleteFile, self).__init__(name=name, config=config)
+        self._spattern = None
+        self._pattern = None
+        self._batch = []
+        self._executor = None
+        self._futures = []
+        self._num_batches = 0
+        self._num_deleted = 0
+        self._num_failed = 0
 
     def description(self):
         """
@@ -172,7 +295,12 @@ class DeleteFile(Transformer):
         :return: the description
         :rtype: str
         """
-        return "Deletes the incoming files that match the regular expression."
+        return "Deletes the incoming files that match the regular expression.\n"\
+               "Deletions can be collected into batches that get processed by a pool of threads.\n"\
+               "Files that fail to get deleted result in an error, unless 'fail_on_error' is off (they only get\n"\
+               "logged and counted then); failures in batches get reported once the batch has been processed.\n"\
+               "NB: the tokens are always forwarded immediately, i.e., in batch mode a file may still exist when its\n"\
+               "token gets passed on; the remaining batch is only deleted when the flow finishes."
 
     @property
     def quickinfo(self):
@@ -182,7 +310,12 @@ class DeleteFile(Transformer):
         :return: the info, None if not available
         :rtype: str
         """
-        return "regexp: " + str(self.config["regexp"])
+        result = "regexp: " + str(self.config["regexp"])
+        if int(self.config["batch_size"]) > 1:
+            result += ", batch: " + str(self.config["batch_size"]) + ", threads: " + str(self.config["num_threads"])
+        if bool(self.config["dry_run"]):
+            result += ", dry-run"
+        return result
 
     def fix_config(self, options):
         """
@@ -201,8 +334,179 @@ class DeleteFile(Transformer):
         if opt not in self.help:
             self.help[opt] = "The regular expression that the files must match (string)."
 
+        opt = "batch_size"
+        if opt not in options:
+            options[opt] = 1
+        if opt not in self.help:
+            self.help[opt] = "The number of files to collect before deleting them as a batch; 1 deletes the files "\
+                             "immediately; incomplete batches get deleted when the flow finishes; the tokens get "\
+                             "forwarded without waiting for their batch to be deleted (int)."
+
+        opt = "num_threads"
+        if opt not in options:
+            options[opt] = 1
+        if opt not in self.help:
+            self.help[opt] = "The number of threads for deleting batches in the background; 1 deletes the batches "\
+                             "in the flow's thread (int)."
+
+        opt = "dry_run"
+        if opt not in options:
+            options[opt] = False
+        if opt not in self.help:
+            self.help[opt] = "Whether to only count the files that would get deleted, e.g., for benchmarking (bool)."
+
+        opt = "fail_on_error"
+        if opt not in options:
+            options[opt] = True
+        if opt not in self.help:
+            self.help[opt] = "Whether a failed deletion results in an error, otherwise it only gets logged and "\
+                             "counted; for batches, the error gets reported once the batch has been processed (bool)."
+
         return options
 
+    @property
+    def num_deleted(self):
+        """
+        Returns the number of files that were deleted (or would have been, in dry-run mode).
+
+        :return: the number of files
+        :rtype: int
+        """
+        return self._num_deleted
+
+    @property
+    def num_failed(self):
+        """
+        Returns the number of files that failed to get deleted.
+
+        :return: the number of files
+        :rtype: int
+        """
+        return self._num_failed
+
+    def _compile_pattern(self, spattern):
+        """
+        Compiles the regular expression, if it differs from the current one.
+
+        :param spattern: the regular expression
+        :type spattern: str
+        """
+        if spattern == self._spattern:
+            return
+        self._spattern = spattern
+        if (spattern is not None) and (spattern != ".*"):
+            self._pattern = re.compile(spattern)
+        else:
+            self._pattern = None
+
+    def setup(self):
+        """
+        Configures the actor before execution.
+
+        :return: None if successful, otherwise error message
+        :rtype: str
+        """
+        result = super(DeleteFile, self).setup()
+        if result is None:
+            try:
+                self._spattern = None
+                self._compile_pattern(str(self.resolve_option("regexp")))
+            except Exception as e:
+                result = "Invalid regular expression: " + str(e)
+        if result is None:
+            self._batch = []
+            self._futures = []
+            self._num_batches = 0
+            self._num_deleted = 0
+            self._num_failed = 0
+            num_threads = int(self.resolve_option("num_threads"))
+            if (int(self.resolve_option("batch_size")) > 1) and (num_threads > 1):
+                from concurrent.futures import ThreadPoolExecutor
+                self._executor = ThreadPoolExecutor(max_workers=num_threads)
+        return result
+
+    def _delete_batch(self, batch, dry_run):
+        """
+        Deletes the files in the batch.
+
+        :param batch: the files to delete
+        :type batch: list
+        :param dry_run: whether to only count the files
+        :type dry_run: bool
+        :return: the number of successful and failed deletions
+        :rtype: tuple
+        """
+        success = 0
+        failed = 0
+        remove = os.remove
+        for fname in batch:
+            if dry_run:
+                success += 1
+                continue
+            try:
+                remove(fname)
+                success += 1
+            except OSError as e:
+                failed += 1
+                self.logger.warning("Failed to delete '" + fname + "': " + str(e))
+        return success, failed
+
+    def _record_batch(self, counts):
+        """
+        Records and reports the counts of a processed batch.
+
+        :param counts: the number of successful and failed deletions
+        :type counts: tuple
+        :return: None if successful or errors are to be ignored, otherwise error message
+        :rtype: str
+        """
+        success, failed = counts
+        self._num_batches += 1
+        self._num_deleted += success
+        self._num_failed += failed
+        self.logger.info("Batch #" + str(self._num_batches) + ": deleted=" + str(success) + ", failed=" + str(failed))
+        if (failed > 0) and bool(self.resolve_option("fail_on_error")):
+            return "Failed to delete " + str(failed) + " file(s) of batch #" + str(self._num_batches) + ", see log"
+        return None
+
+    def _collect_finished(self, wait=False):
+        """
+        Records the counts of the batches that were processed in the background.
+
+        :param wait: whether to wait for all batches to finish
+        :type wait: bool
+        :return: None if successful or errors are to be ignored, otherwise (the first) error message
+        :rtype: str
+        """
+        result = None
+        pending = []
+        for future in self._futures:
+            if wait or future.done():
+                msg = self._record_batch(future.result())
+                if result is None:
+                    result = msg
+            else:
+                pending.append(future)
+        self._futures = pending
+        return result
+
+    def _flush(self):
+        """
+        Deletes the currently collected batch.
+
+        :return: None if successful or errors are to be ignored, otherwise error message
+        :rtype: str
+        """
+        if len(self._batch) == 0:
+            return None
+        batch = self._batch
+        self._batch = []
+        dry_run = bool(self.resolve_option("dry_run"))
+        if self._executor is None:
+            return self._record_batch(self._delete_batch(batch, dry_run))
+        self._futures.append(self._executor.submit(self._delete_batch, batch, dry_run))
+        return self._collect_finished()
+
     def do_execute(self):
         """
         The actual execution of the actor.
@@ -211,15 +515,329 @@ class DeleteFile(Transformer):
         :rtype: str
         """
         fname = str(self.input.payload)
-        spattern = str(self.resolve_option("regexp"))
-        pattern = None
-        if (spattern is not None) and (spattern != ".*"):
-            pattern = re.compile(spattern)
-        if (pattern is None) or (pattern.match(fname)):
-            os.remove(fname)
+        self._compile_pattern(str(self.resolve_option("regexp")))
+        if (self._pattern is None) or (self._pattern.match(fname)):
+            batch_size = int(self.resolve_option("batch_size"))
+            if batch_size <= 1:
+                try:
+                    if not bool(self.resolve_option("dry_run")):
+                        os.remove(fname)
+                    self._num_deleted += 1
+                except OSError as e:
+                    self._num_failed += 1
+                    msg = "Failed to delete '" + fname + "': " + str(e)
+                    if bool(self.resolve_option("fail_on_error")):
+                        return msg
+                    self.logger.warning(msg)
+            else:
+                self._batch.append(fname)
+                if len(self._batch) >= batch_size:
+                    msg = self._flush()
+                    if msg is not None:
+                        return msg
         self._output.append(self.input)
         return None
 
+    def wrapup(self):
+        """
+        Finishes up after execution finishes, does not remove any graphical output.
+        """
+        msg = self._flush()
+        if msg is not None:
+            self.logger.error(msg)
+        if self._executor is not None:
+            msg = self._collect_finished(wait=True)
+            if msg is not None:
+                self.logger.error(msg)
+            self._executor.shutdown()
+            self._executor = None
+        if (self._num_batches > 0) or (self._num_failed > 0):
+            self.logger.info("Total: batches=" + str(self._num_batches) + ", deleted=" + str(self._num_deleted)
+                             + ", failed=" + str(self._num_failed))
+        super(DeleteFile, self).wrapup()
+
+
+class Limit(Transformer):
+    """
+    Only forwards the first N tokens of each stream, i.e., of each execution of the enclosing Flow or Trigger
+    (or of each payload processed by a CompiledFlow). Sub-flows like Sequence or Tee do not start a new
+    stream.
+    Once the limit is reached, the actors preceding it get told not to produce any further tokens.
+    """
+
+    def __init__(self, name=None, config=None):
+        """
+        Initializes the transformer.
+
+        :param name: the name of the transformer
+        :type name: str
+        :param config: the dictionary with the options (str -> object).
+        :type config: dict
+        """
+        super(Limit, self).__init__(name=name, config=config)
+        self._count = 0
+        self._stream = None
+        self._run = None
+
+    def description(self):
+        """
+        Returns a description of the actor.
+
+        :return: the description
+        :rtype: str
+        """
+        return "Only forwards the first N tokens of each stream, i.e., of each execution of the enclosing Flow\n"\
+               "or Trigger (or of each payload processed by a CompiledFlow). Sub-flows like Sequence or Tee\n"\
+               "do not start a new stream.\n"\
+               "Once the limit is reached, the actors preceding it get told not to produce any further tokens."
+
+    @property
+    def quickinfo(self):
+        """
+        Returns a short string describing some of the options of the actor.
+
+        :return: the info, None if not available
+        :rtype: str
+        """
+        return "limit: " + str(self.config["limit"])
+
+    def fix_config(self, options):
+        """
+        Fixes the options, if necessary. I.e., it adds all required elements to the dictionary.
+
+        :param options: the options to fix
+        :type options: dict
+        :return: the (potentially) fixed options
+        :rtype: dict
+        """
+        options = super(Limit, self).fix_config(options)
+
+        opt = "limit"
+        if opt not in options:
+            options[opt] = 10
+        if opt not in self.help:
+            self.help[opt] = "The maximum number of tokens to forward per stream (int)."
+
+        return options
+
+    def setup(self):
+        """
+        Configures the actor before execution, determines the director whose executions start the streams.
+
+        :return: None if successful, otherwise error message
+        :rtype: str
+        """
+        result = super(Limit, self).setup()
+        if result is None:
+            handler = self.parent
+            while (handler.parent is not None) and not handler.director.starts_stream:
+                handler = handler.parent
+            self._stream = handler.director
+            self._run = None
+            self._count = 0
+        return result
+
+    def do_execute(self):
+        """
+        The actual execution of the actor.
+
+        :return: None if successful, otherwise error message
+        :rtype: str
+        """
+        if self._run != self._stream.runs:
+            self._run = self._stream.runs
+            self._count = 0
+        limit = int(self.resolve_option("limit"))
+        if self._count < limit:
+            self._count += 1
+            self._output.append(self.input)
+        if self._count >= limit:
+            self.parent.director.drop_pending(self)
+        return None
+
+
+class MemoryMapFile(Transformer):
+    """
+    Memory-maps the incoming file and forwards its content as memoryview, either as a whole or in chunks.
+    Chunks can be of fixed size or get extended to the next occurrence of the delimiter. Chunks only get
+    generated when requested.
+    """
+
+    def __init__(self, name=None, config=None):
+        """
+        Initializes the transformer.
+
+        :param name: the name of the transformer
+        :type name: str
+        :param config: the dictionary with the options (str -> object).
+        :type config: dict
+        """
+        super(MemoryMapFile, self).__init__(name=name, config=config)
+        self._chunks = None
+
+    def description(self):
+        """
+        Returns a description of the actor.
+
+        :return: the description
+        :rtype: str
+        """
+        return "Memory-maps the incoming file and forwards its content as memoryview, either as a whole or in chunks.\n"\
+               "Chunks can be of fixed size or get extended to the next occurrence of the delimiter."
+
+    @property
+    def quickinfo(self):
+        """
+        Returns a short string describing some of the options of the actor.
+
+        :return: the info, None if not available
+        :rtype: str
+        """
+        return "chunk: " + str(self.config["chunk_size"]) + ", delimiter: " + repr(self.config["delimiter"])
+
+    def fix_config(self, options):
+        """
+        Fixes the options, if necessary. I.e., it adds all required elements to the dictionary.
+
+        :param options: the options to fix
+        :type options: dict
+        :return: the (potentially) fixed options
+        :rtype: dict
+        """
+        options = super(MemoryMapFile, self).fix_config(options)
+
+        opt = "chunk_size"
+        if opt not in options:
+            options[opt] = 0
+        if opt not in self.help:
+            self.help[opt] = "The size in bytes of the chunks to forward; 0 forwards the whole file (int)."
+
+        opt = "delimiter"
+        if opt not in options:
+            options[opt] = ""
+        if opt not in self.help:
+            self.help[opt] = "The delimiter that chunks get extended to (the delimiter is included in the chunk), "\
+                             "e.g., '\\n' for line-aligned chunks; empty string for fixed-size chunks (string)."
+
+        return options
+
+    def check_input(self, token):
+        """
+        Performs checks on the input token. Raises an exception if unsupported.
+
+        :param token: the token to check
+        :type token: Token
+        """
+        if token is None:
+            raise Exception(self.full_name + ": No token provided!")
+        if not isinstance(token.payload, str):
+            raise Exception(self.full_name + ": Expected file name (str), but got: " + str(type(token.payload)))
+
+    def do_execute(self):
+        """
+        The actual execution of the actor.
+
+        :return: None if successful, otherwise error message
+        :rtype: str
+        """
+        fname = str(self.input.payload)
+        if not os.path.isfile(fname):
+            return "File '" + fname + "' does not exist or is not a file!"
+
+        # the mapping stays alive as long as there are memoryviews referencing it
+        with open(fname, "rb") as f:
+            size = os.fstat(f.fileno()).st_size
+            if size == 0:
+                self._output.append(Token(memoryview(b"")))
+                return None
+            import mmap
+            mm = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        view = memoryview(mm)
+
+        chunk_size = int(self.resolve_option("chunk_size"))
+        if chunk_size <= 0:
+            self._output.append(Token(view))
+            return None
+
+        delimiter = str(self.resolve_option("delimiter")).encode("utf-8")
+        self._chunks = self._iterate(mm, view, size, chunk_size, delimiter)
+        return None
+
+    def _iterate(self, mm, view, size, chunk_size, delimiter):
+        """
+        Generates the chunks of the memory-mapped file.
+
+        :param mm: the memory-mapped file
+        :type mm: mmap.mmap
+        :param view: the view on the complete file
+        :type view: memoryview
+        :param size: the size of the file
+        :type size: int
+        :param chunk_size: the size of the chunks
+        :type chunk_size: int
+        :param delimiter: the delimiter to extend the chunks to, empty for fixed-size chunks
+        :type delimiter: bytes
+        """
+        start = 0
+        while start < size:
+            end = start + chunk_size
+            if end >= size:
+                end = size
+            elif len(delimiter) > 0:
+                pos = mm.find(delimiter, max(start, end - len(delimiter)))
+                if pos == -1:
+                    end = size
+                else:
+                    end = pos + len(delimiter)
+            yield view[start:end]
+            start = end
+
+    def pre_execute(self):
+        """
+        Gets executed before the actual execution.
+
+        :return: None if successful, otherwise error message
+        :rtype: str
+        """
+        self._chunks = None
+        return super(MemoryMapFile, self).pre_execute()
+
+    def has_output(self):
+        """
+        Checks whether any output tokens are present.
+
+        :return: true if at least one output token present
+        :rtype: bool
+        """
+        if super(MemoryMapFile, self).has_output():
+            return True
+        if self._chunks is not None:
+            chunk = next(self._chunks, None)
+            if chunk is None:
+                self._chunks = None
+            else:
+                self._output.append(Token(chunk))
+                return True
+        return False
+
+    def output(self):
+        """
+        Returns the next available output token.
+
+        :return: the next token, None if none available
+        :rtype: Token
+        """
+        if not self.has_output():
+            return None
+        return super(MemoryMapFile, self).output()
+
+    def clear_output(self):
+        """
+        Removes all pending output tokens, including the chunks not generated yet.
+        """
+        super(MemoryMapFile, self).clear_output()
+        self._chunks = None
+
 
 class SetStorageValue(Transformer):
     """
@@ -273,6 +891,14 @@ class SetStorageValue(Transformer):
         if opt not in self.help:
             self.help[opt] = "The storage value name for storing the payload under (string)."
 
+        opt = "operation"
+        if opt not in options:
+            options[opt] = "set"
+        if opt not in self.help:
+            self.help[opt] = "How to store the payload: set (replaces the value), append (atomically appends it "\
+                             "to the list stored under the name) or increment (atomically adds it to the "\
+                             "value, starting from 0) (string)."
+
         return options
 
     def do_execute(self):
@@ -284,7 +910,18 @@ class SetStorageValue(Transformer):
         """
         if self.storagehandler is None:
             return "No storage handler available!"
-        self.storagehandler.storage[self.resolve_option("storage_name")] = self.input.payload
+        name = self.resolve_option("storage_name")
+        operation = str(self.resolve_option("operation"))
+        if operation == "set":
+            self.storagehandler.storage[name] = self.input.payload
+        elif operation == "append":
+            import simflow.storage as storage
+            storage.append(self.storagehandler.storage, name, self.input.payload)
+        elif operation == "increment":
+            import simflow.storage as storage
+            storage.increment(self.storagehandler.storage, name, delta=self.input.payload)
+        else:
+            return "Unsupported operation: " + operation
         self._output.append(self.input)
         return None
 
@@ -372,6 +1009,8 @@ class InitStorageValue(Transformer):
         :type config: dict
         """
         super(InitStorageValue, self).__init__(name=name, config=config)
+        self._constant = None
+        self._has_constant = False
 
     def description(self):
         """
@@ -415,8 +1054,46 @@ class InitStorageValue(Transformer):
         if opt not in self.help:
             self.help[opt] = "The initial value (string)."
 
+        opt = "overwrite"
+        if opt not in options:
+            options[opt] = True
+        if opt not in self.help:
+            self.help[opt] = "Whether to overwrite an existing value; otherwise the value only gets set "\
+                             "(atomically) if not present yet (bool)."
+
         return options
 
+    @property
+    def has_constant(self):
+        """
+        Returns whether a pre-computed value is used instead of evaluating the value.
+
+        :return: True if pre-computed value available
+        :rtype: bool
+        """
+        return self._has_constant
+
+    def _value(self):
+        """
+        Returns the value to store.
+
+        :return: the value
+        :rtype: object
+        """
+        if self._has_constant:
+            return self._constant
+        return eval(str(self.resolve_option("value")))
+
+    def set_constant(self, value):
+        """
+        Sets the pre-computed value to use instead of evaluating the value, e.g., by the optimizer.
+
+        :param value: the value, must be immutable
+        :type value: object
+        """
+        self._constant = value
+        self._has_constant = True
+
     def do_execute(self):
         """
         The actual execution of the actor.
@@ -426,7 +1103,14 @@ class InitStorageValue(Transformer):
         """
         if self.storagehandler is None:
             return "No storage handler available!"
-        self.storagehandler.storage[self.resolve_option("storage_name")] = eval(str(self.resolve_option("value")))
+        name = self.resolve_option("storage_name")
+        if bool(self.resolve_option("overwrite")):
+            self.storagehandler.storage[name] = self._value()
+        else:
+            import simflow.storage as storage
+            with storage.lock_for(self.storagehandler.storage, name):
+                if name not in self.storagehandler.storage:
+                    self.storagehandler.storage[name] = self._value()
         self._output.append(self.input)
         return None
 
@@ -447,6 +1131,9 @@ class UpdateStorageValue(Transformer):
         :type config: dict
         """
         super(UpdateStorageValue, self).__init__(name=name, config=config)
+        self._expression = None
+        self._compiled = None
+        self._names = None
 
     def description(self):
         """
@@ -490,10 +1177,49 @@ class UpdateStorageValue(Transformer):
         if opt not in options:
             options[opt] = "int({X} + 1)"
         if opt not in self.help:
-            self.help[opt] = "The expression for updating the storage value; use {X} for current value (string)."
+            self.help[opt] = "The expression for updating the storage value; use {X} for current value and @{name} "\
+                             "for other storage values, which get bound as variables; within string literals, "\
+                             "they get replaced with their string representation instead (string)."
+
+        opt = "atomic"
+        if opt not in options:
+            options[opt] = False
+        if opt not in self.help:
+            self.help[opt] = "Whether to perform the update atomically, i.e., without other atomic operations "\
+                             "on the same storage value interfering (bool)."
 
         return options
 
+    def _compile(self, expr):
+        """
+        Compiles the expression, with the current value and the referenced storage values being
+        bound as variables rather than getting substituted as strings. Falls back on string
+        substitution if placeholders are used within string literals.
+
+        :param expr: the expression to compile
+        :type expr: str
+        """
+        self._expression = expr
+        self._compiled = None
+        names = []
+
+        def storage_var(m):
+            if m.group(1) not in names:
+                names.append(m.group(1))
+            return "__S" + str(names.index(m.group(1))) + "__"
+
+        source = re.sub(r"@\{([^}]*)\}", storage_var, expr).replace("{X}", "__X__")
+        import tokenize
+        from io import StringIO
+        try:
+            for token in tokenize.generate_tokens(StringIO(source).readline):
+                if (token.type != tokenize.NAME) and (("__X__" in token.string) or ("__S" in token.string)):
+                    return
+            self._compiled = compile(source, "<" + self.full_name + ">", "eval")
+            self._names = names
+        except (SyntaxError, tokenize.TokenError):
+            self._compiled = None
+
     def do_execute(self):
         """
         The actual execution of the actor.
@@ -503,10 +1229,25 @@ class UpdateStorageValue(Transformer):
         """
         if self.storagehandler is None:
             return "No storage handler available!"
-        expr = str(self.resolve_option("expression")).replace(
-            "{X}", str(self.storagehandler.storage[str(self.resolve_option("storage_name"))]))
-        expr = self.storagehandler.expand(expr)
-        self.storagehandler.storage[self.resolve_option("storage_name")] = eval(expr)
+        name = str(self.resolve_option("storage_name"))
+        expr = str(self.resolve_option("expression"))
+        if expr != self._expression:
+            self._compile(expr)
+
+        def update(value):
+            if self._compiled is None:
+                return eval(self.storagehandler.expand(expr.replace("{X}", str(value))))
+            variables = {"__X__": value}
+            for i, n in enumerate(self._names):
+                variables["__S" + str(i) + "__"] = self.storagehandler.storage[n]
+            return eval(self._compiled, globals(), variables)
+
+        if bool(self.resolve_option("atomic")):
+            import simflow.storage as storage
+            with storage.lock_for(self.storagehandler.storage, name):
+                self.storagehandler.storage[name] = update(self.storagehandler.storage[name])
+        else:
+            self.storagehandler.storage[name] = update(self.storagehandler.storage[name])
         self._output.append(self.input)
         return None
 
@@ -528,6 +1269,8 @@ class MathExpression(Transformer):
         :type config: dict
         """
         super(MathExpression, self).__init__(name=name, config=config)
+        self._chained = []
+        self._compiled = []
 
     def description(self):
         """
@@ -549,7 +1292,10 @@ class MathExpression(Transformer):
         :return: the info, None if not available
         :rtype: str
         """
-        return "expression: " + str(self.config["expression"])
+        result = "expression: " + str(self.config["expression"])
+        if len(self.config["chained_expressions"]) > 0:
+            result += ", chained: " + str(len(self.config["chained_expressions"]))
+        return result
 
     def fix_config(self, options):
         """
@@ -568,8 +1314,46 @@ class MathExpression(Transformer):
         if opt not in self.help:
             self.help[opt] = "The mathematical expression to evaluate (string)."
 
+        opt = "chained_expressions"
+        if opt not in options:
+            options[opt] = []
+        if opt not in self.help:
+            self.help[opt] = "The expressions to evaluate one after the other on the result, like a chain of "\
+                             "MathExpression actors (list of string)."
+
         return options
 
+    def _compile(self, expr):
+        """
+        Compiles the chained expression with the placeholder bound as variable, if binding a
+        non-negative number gives the same result as substituting its string representation, i.e.,
+        if the placeholder is used as an operand only.
+
+        :param expr: the expression to compile
+        :type expr: str
+        :return: the compiled expression, None if the string needs to be substituted
+        """
+        operators = ("not", "and", "or", "in", "is", "if", "else")
+        source = expr.replace("{X}", "__X__")
+        import tokenize
+        from io import StringIO
+        try:
+            tokens = [t for t in tokenize.generate_tokens(StringIO(source).readline)
+                      if t.type not in (tokenize.NEWLINE, tokenize.NL, tokenize.ENDMARKER)]
+            for i, token in enumerate(tokens):
+                if "__X__" not in token.string:
+                    continue
+                if (token.type != tokenize.NAME) or (token.string != "__X__"):
+                    return None
+                for other in tokens[i - 1:i] + tokens[i + 1:i + 2]:
+                    if (other.type == tokenize.NAME) and (other.string not in operators):
+                        return None
+                    if (other.type in (tokenize.NUMBER, tokenize.STRING)) or (other.string in (".", "=", ":=")):
+                        return None
+            return compile(source, "<" + self.full_name + ">", "eval")
+        except (SyntaxError, tokenize.TokenError):
+            return None
+
     def do_execute(self):
         """
         The actual execution of the actor.
@@ -579,5 +1363,17 @@ class MathExpression(Transformer):
         """
         expr = str(self.resolve_option("expression"))
         expr = expr.replace("{X}", str(self.input.payload))
-        self._output.append(Token(eval(expr)))
+        value = eval(expr)
+
+        chained = list(self.resolve_option("chained_expressions"))
+        if chained != self._chained:
+            self._chained = chained
+            self._compiled = [self._compile(e) for e in chained]
+        for expr, compiled in zip(self._chained, self._compiled):
+            if (compiled is not None) and (type(value) in (int, float)) and (0 <= value < math.inf):
+                value = eval(compiled, globals(), {"__X__": value})
+            else:
+                value = eval(expr.replace("{X}", str(value)))
+
+        self._output.append(Token(value))
         return None
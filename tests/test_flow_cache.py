@@ -0,0 +1,73 @@
+import os
+import pickle
+import shutil
+import tempfile
+import unittest
+
+import simflow.control as control
+from simflow.control import Flow
+from simflow.sink import Null
+from simflow.source import ForLoop
+
+
+class Marker(object):
+    """
+    Records that it got unpickled.
+    """
+
+    unpickled = False
+
+    def __reduce__(self):
+        return _mark, ()
+
+
+def _mark():
+    Marker.unpickled = True
+    return None
+
+
+class TestFlowCache(unittest.TestCase):
+
+    def setUp(self):
+        self.tmp = tempfile.mkdtemp()
+        self.key_file = control.FLOW_CACHE_KEY_FILE
+        control.FLOW_CACHE_KEY_FILE = os.path.join(self.tmp, "secret", "cache.key")
+        self.fname = os.path.join(self.tmp, "flow.json")
+        flow = Flow(name="cached")
+        flow.actors.append(ForLoop(config={"max": 3}))
+        flow.actors.append(Null())
+        Flow.save(flow, self.fname)
+
+    def tearDown(self):
+        control.FLOW_CACHE_KEY_FILE = self.key_file
+        shutil.rmtree(self.tmp)
+
+    def test_warm_load(self):
+        cold = Flow.load(self.fname, use_cache=True)
+        self.assertTrue(os.path.exists(self.fname + ".cache"))
+        warm = Flow.load(self.fname, use_cache=True)
+        self.assertEqual(cold.to_json(), warm.to_json())
+
+    def test_changed_flow(self):
+        Flow.load(self.fname, use_cache=True)
+        flow = Flow.load(self.fname)
+        flow.actors[0].config["max"] = 5
+        Flow.save(flow, self.fname)
+        self.assertEqual(5, Flow.load(self.fname, use_cache=True).actors[0].config["max"])
+
+    def test_tampered_cache(self):
+        Flow.load(self.fname, use_cache=True)
+        with open(self.fname + ".cache", "rb") as f:
+            content = f.read()
+        header = len(control.FLOW_CACHE_MAGIC) + 32
+        with open(self.fname + ".cache", "wb") as f:
+            f.write(content[:header])
+            f.write(pickle.dumps(Marker()))
+        Marker.unpickled = False
+        flow = Flow.load(self.fname, use_cache=True)
+        self.assertFalse(Marker.unpickled)
+        self.assertEqual("cached", flow.name)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,62 @@
+import unittest
+
+from simflow.control import CompiledFlow, Flow, Sequence, Tee, Trigger, run_flow
+from simflow.sink import Sink
+from simflow.source import ForLoop
+from simflow.transformer import Limit
+
+
+class Collect(Sink):
+    """
+    Collects the incoming payloads.
+    """
+
+    collected = []
+
+    def do_execute(self):
+        Collect.collected.append(self.input.payload)
+        return None
+
+
+class TestLimit(unittest.TestCase):
+
+    def setUp(self):
+        Collect.collected = []
+
+    def test_flow(self):
+        flow = Flow()
+        flow.actors = [ForLoop(config={"max": 10}), Limit(config={"limit": 3}), Collect()]
+        self.assertIsNone(run_flow(flow))
+        self.assertEqual([1, 2, 3], Collect.collected)
+
+    def test_tee(self):
+        flow = Flow()
+        flow.actors = [ForLoop(config={"max": 6}), Tee(config={"actors": [Limit(config={"limit": 2}), Collect()]})]
+        self.assertIsNone(run_flow(flow))
+        self.assertEqual([1, 2], Collect.collected)
+        # new flow run, new stream
+        self.assertIsNone(run_flow(flow))
+        self.assertEqual([1, 2, 1, 2], Collect.collected)
+
+    def test_trigger(self):
+        trigger = Trigger(config={"actors": [ForLoop(config={"max": 10}), Limit(config={"limit": 2}), Collect()]})
+        flow = Flow()
+        flow.actors = [ForLoop(config={"max": 3}), trigger]
+        self.assertIsNone(run_flow(flow))
+        self.assertEqual([1, 2, 1, 2, 1, 2], Collect.collected)
+
+    def test_compiled_flow(self):
+        with CompiledFlow(Sequence(config={"actors": [Limit(config={"limit": 2})]})) as compiled:
+            counts = [len(compiled.process(i)) for i in range(5)]
+        self.assertEqual([1, 1, 1, 1, 1], counts)
+
+    def test_compiled_flow_trigger(self):
+        trigger = Trigger(config={"actors": [ForLoop(config={"max": 10}), Limit(config={"limit": 2}), Collect()]})
+        with CompiledFlow(Sequence(config={"actors": [trigger]})) as compiled:
+            for i in range(3):
+                compiled.process(i)
+        self.assertEqual([1, 2, 1, 2, 1, 2], Collect.collected)
+
+
+if __name__ == "__main__":
+    unittest.main()
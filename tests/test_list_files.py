@@ -0,0 +1,59 @@
+import os
+import shutil
+import tempfile
+import unittest
+
+from simflow.source import ListFiles
+
+
+def _outputs(source):
+    """
+    Executes the source and returns the paths that it outputs.
+
+    :param source: the source to execute
+    :type source: ListFiles
+    :return: the paths
+    :rtype: list
+    """
+    result = []
+    assert source.setup() is None
+    assert source.execute() is None
+    while source.has_output():
+        result.append(os.path.basename(source.output().payload))
+    source.wrapup()
+    return result
+
+
+class TestListFiles(unittest.TestCase):
+
+    def setUp(self):
+        self.tmp = tempfile.mkdtemp()
+        for name in ["c.txt", "a.txt", "e.txt", "b.txt"]:
+            open(os.path.join(self.tmp, name), "w").close()
+
+    def tearDown(self):
+        shutil.rmtree(self.tmp)
+
+    def test_sorted(self):
+        self.assertEqual(["a.txt", "b.txt", "c.txt", "e.txt"], _outputs(ListFiles(config={"dir": self.tmp})))
+
+    def test_resume_after_changes(self):
+        source = ListFiles(config={"dir": self.tmp})
+        assert source.setup() is None
+        assert source.execute() is None
+        source.output()
+        source.output()
+        position = source.position
+        self.assertEqual("b.txt", os.path.basename(position))
+        source.wrapup()
+        # files get removed and added between the runs
+        os.remove(os.path.join(self.tmp, "a.txt"))
+        os.remove(os.path.join(self.tmp, "b.txt"))
+        open(os.path.join(self.tmp, "d.txt"), "w").close()
+        source = ListFiles(config={"dir": self.tmp})
+        source.resume_from(position)
+        self.assertEqual(["c.txt", "d.txt", "e.txt"], _outputs(source))
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,42 @@
+import unittest
+
+from simflow.base import Token
+from simflow.control import CompiledFlow, Memoize, Sequence
+from simflow.transformer import Transformer
+
+
+class Wrap(Transformer):
+    """
+    Wraps the payload in a list.
+    """
+
+    def do_execute(self):
+        self._output.append(Token([self.input.payload]))
+        return None
+
+
+class Mark(Transformer):
+    """
+    Appends a marker to the list payload, modifying it in place.
+    """
+
+    def do_execute(self):
+        self.input.payload.append("seen")
+        self._output.append(self.input)
+        return None
+
+
+class TestMemoize(unittest.TestCase):
+
+    def test_hits_forward_copies(self):
+        memoize = Memoize(config={"actors": [Wrap()]})
+        with CompiledFlow(Sequence(config={"actors": [memoize, Mark()]})) as compiled:
+            results = [[token.payload for token in compiled.process(1)] for i in range(3)]
+        self.assertEqual(2, memoize.hits)
+        self.assertEqual(1, memoize.misses)
+        for result in results:
+            self.assertEqual([[1, "seen"]], result)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,35 @@
+import unittest
+
+from simflow.base import REFILL_CHUNK_SIZE, BufferBudget, OutputBuffer, Token
+
+
+class TestRefill(unittest.TestCase):
+
+    def test_spill_threshold(self):
+        buf = OutputBuffer(BufferBudget(spill_threshold=5))
+        buf.extend([Token(i) for i in range(20)])
+        self.assertEqual(15, buf.spilled)
+        payloads = [buf.pop().payload for i in range(6)]
+        self.assertEqual(list(range(6)), payloads)
+        # only a chunk of the size of the threshold got read back
+        self.assertEqual(10, buf.spilled)
+
+    def test_chunk_size(self):
+        budget = BufferBudget(max_bytes=10**6, policy="spill")
+        other = OutputBuffer(budget)
+        other.append(Token(bytes(900000)))
+        buf = OutputBuffer(budget)
+        buf.extend([Token(i) for i in range(20000)])
+        spilled = buf.spilled
+        self.assertGreater(spilled, REFILL_CHUNK_SIZE)
+        in_memory = len(buf) - spilled
+        other.pop()
+        payloads = [buf.pop().payload for i in range(in_memory + 1)]
+        self.assertEqual(list(range(in_memory + 1)), payloads)
+        # the budget is free again, but the chunk size limits the tokens read back
+        self.assertEqual(spilled - REFILL_CHUNK_SIZE, buf.spilled)
+        self.assertEqual(list(range(in_memory + 1, 20000)), [buf.pop().payload for i in range(len(buf))])
+
+
+if __name__ == "__main__":
+    unittest.main()
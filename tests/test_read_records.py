@@ -0,0 +1,62 @@
+import bz2
+import gzip
+import lzma
+import os
+import shutil
+import tempfile
+import unittest
+
+from simflow.source import ReadRecords
+
+LINES = ["line " + str(i) for i in range(1000)]
+
+
+def _outputs(source):
+    """
+    Executes the source and returns the payloads that it outputs.
+
+    :param source: the source to execute
+    :type source: ReadRecords
+    :return: the payloads
+    :rtype: list
+    """
+    result = []
+    assert source.setup() is None
+    assert source.execute() is None
+    while source.has_output():
+        result.append(source.output().payload)
+    source.wrapup()
+    return result
+
+
+class TestReadRecords(unittest.TestCase):
+
+    def setUp(self):
+        self.tmp = tempfile.mkdtemp()
+
+    def tearDown(self):
+        shutil.rmtree(self.tmp)
+
+    def check_compression(self, ext, opener):
+        fname = os.path.join(self.tmp, "records.txt" + ext)
+        with opener(fname, "wb") as f:
+            f.write(("\n".join(LINES) + "\n").encode("utf-8"))
+        self.assertEqual(LINES, _outputs(ReadRecords(config={"file": fname, "buffer_size": 64})))
+        offset = len(("\n".join(LINES[:10]) + "\n").encode("utf-8"))
+        self.assertEqual(LINES[10:], _outputs(ReadRecords(config={"file": fname, "offset": offset})))
+
+    def test_none(self):
+        self.check_compression("", open)
+
+    def test_gzip(self):
+        self.check_compression(".gz", gzip.open)
+
+    def test_bz2(self):
+        self.check_compression(".bz2", bz2.open)
+
+    def test_xz(self):
+        self.check_compression(".xz", lzma.open)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,50 @@
+import time
+import unittest
+
+from simflow.control import Flow
+from simflow.scheduler import Scheduler
+from simflow.sink import Null
+from simflow.source import ForLoop
+
+
+class FailingFlow(Flow):
+    """
+    Flow whose execution raises an exception instead of returning an error message.
+    """
+
+    wrapups = 0
+
+    def execute(self):
+        raise RuntimeError("failing on purpose")
+
+    def wrapup(self):
+        FailingFlow.wrapups += 1
+        super(FailingFlow, self).wrapup()
+
+
+class TestScheduler(unittest.TestCase):
+
+    def test_failing_flow_gets_wrapped_up(self):
+        FailingFlow.wrapups = 0
+        flow = FailingFlow()
+        flow.actors = [ForLoop(config={"max": 3}), Null()]
+        scheduler = Scheduler(max_workers=1)
+        scheduler.add("failing", flow, 3600)
+        scheduler.start()
+        try:
+            scheduler.run_now("failing")
+            for i in range(100):
+                if scheduler.stats("failing")["runs"] > 0:
+                    break
+                time.sleep(0.05)
+        finally:
+            scheduler.stop()
+        stats = scheduler.stats("failing")
+        self.assertEqual(1, stats["runs"])
+        self.assertEqual(1, stats["failures"])
+        self.assertIn("failing on purpose", stats["last_error"])
+        self.assertEqual(1, FailingFlow.wrapups)
+
+
+if __name__ == "__main__":
+    unittest.main()
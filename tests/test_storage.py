@@ -0,0 +1,94 @@
+import os
+import tempfile
+import unittest
+
+from simflow.control import Flow, run_flow
+from simflow.source import ForLoop
+from simflow.transformer import SetStorageValue
+from simflow.storage import DictStorage, StripedLockStorage, SharedMemoryStorage, SpillStorage
+from simflow.storage import load_snapshot, save_snapshot
+
+
+def _flow(backend):
+    """
+    Generates a flow that stores the numbers 1-5 under 'last'.
+
+    :param backend: the storage backend, None for the dictionary
+    :type backend: Storage
+    :return: the flow
+    :rtype: Flow
+    """
+    result = Flow()
+    result.config["storage"] = backend
+    result.actors.append(ForLoop(config={"max": 5}))
+    result.actors.append(SetStorageValue(config={"storage_name": "last"}))
+    return result
+
+
+class TestStorageAfterRun(unittest.TestCase):
+
+    def check_backend(self, backend):
+        flow = _flow(backend)
+        self.assertIsNone(run_flow(flow))
+        self.assertEqual({"last": 5}, dict(flow.storage))
+        # running again works on the closed backend
+        self.assertIsNone(run_flow(flow))
+        self.assertEqual(5, flow.storage["last"])
+        flow.cleanup()
+
+    def test_dict(self):
+        self.check_backend(None)
+
+    def test_dict_storage(self):
+        self.check_backend(DictStorage())
+
+    def test_striped_lock_storage(self):
+        self.check_backend(StripedLockStorage())
+
+    def test_shared_memory_storage(self):
+        self.check_backend(SharedMemoryStorage())
+
+    def test_spill_storage(self):
+        self.check_backend(SpillStorage(config={"max_memory": 0}))
+
+    def test_shared_memory_after_close(self):
+        backend = SharedMemoryStorage()
+        backend["data"] = b"abc"
+        backend.close()
+        self.assertEqual(b"abc", SharedMemoryStorage.attach(backend.descriptor("data")))
+        self.assertEqual(b"abc", backend["data"])
+        backend.destroy()
+        self.assertNotIn("data", backend)
+
+    def test_spill_storage_after_close(self):
+        backend = SpillStorage(config={"max_memory": 0})
+        backend["a"] = 1
+        backend["b"] = [2]
+        backend.close()
+        self.assertEqual(1, backend["a"])
+        self.assertEqual([2], backend["b"])
+        backend.destroy()
+
+
+class TestSnapshot(unittest.TestCase):
+
+    def setUp(self):
+        fd, self.fname = tempfile.mkstemp(suffix=".snapshot")
+        os.close(fd)
+
+    def tearDown(self):
+        os.remove(self.fname)
+
+    def test_round_trip(self):
+        values = {"a": 1, "b": bytearray(b"xyz" * 1000), "c": [1, "2"]}
+        self.assertEqual([], save_snapshot(values, self.fname))
+        self.assertEqual(values, load_snapshot(self.fname))
+
+    def test_invalid_header(self):
+        with open(self.fname, "wb") as f:
+            f.write(b"SIMFLOW-SNAPSHOT-1\n")
+        self.assertRaises(Exception, load_snapshot, self.fname)
+
+
+if __name__ == "__main__":
+    unittest.main()